@@ -37,8 +37,42 @@ import ApiKeyInput from './components/ApiKeyInput';
 const MAX_UPLOAD_SIZE = parseInt(process.env.REACT_APP_MAX_UPLOAD_SIZE || '250', 10);
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000';
 
+// Labels for the pipeline stages reported by /task/{id}/events
+const TASK_STAGE_LABELS = {
+  queued: 'Waiting in queue',
+  starting: 'Starting',
+  extracting_audio: 'Extracting audio',
+  transcribing: 'Transcribing',
+  fact_checking: 'Fact-checking',
+  searching: 'Searching the web',
+};
+
 const stageColors = ['from-blue-400 to-blue-500', 'from-purple-400 to-purple-500', 'from-pink-400 to-pink-500'];
 
+// Read a Server-Sent Events response body, calling onEvent(event, data) for each message
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      const dataLines = [];
+      message.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (dataLines.length > 0) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  }
+};
+
 // Helper function to extract fact check data from HTML content
 const extractFactCheckData = (htmlContent) => {
   if (!htmlContent) return null;
@@ -680,6 +714,7 @@ function App() {
   const [webSearchDisabled, setWebSearchDisabled] = useState(false); // Whether checkbox should be disabled
   const [taskId, setTaskId] = useState(null); // Track task ID for background processing
   const [pollingInterval, setPollingInterval] = useState(null); // Interval for polling task status
+  const taskEventsRef = useRef(null); // EventSource following a background task
   const [openaiApiKey, setOpenaiApiKey] = useState(''); // Store the user's OpenAI API key
 
   // Common language options
@@ -747,6 +782,38 @@ function App() {
     };
   }, [pollingInterval]);
 
+  // Effect to close the task event stream when component unmounts
+  useEffect(() => {
+    return () => {
+      if (taskEventsRef.current) {
+        taskEventsRef.current.close();
+      }
+    };
+  }, []);
+
+  // Show the final status of a background task
+  const completeTask = useCallback((taskData) => {
+    setLoading(false);
+    
+    if (taskData.status === 'error') {
+      setResult(null);
+      setError(taskData.error || 'An error occurred during processing');
+    } else {
+      // Store the completed result data
+      setResult(taskData);
+      
+      // Store detected language if available
+      if (taskData.detected_language) {
+        setDetectedLanguage(taskData.detected_language);
+      }
+      
+      // Store model information if available
+      if (taskData.models) {
+        setModelInfo(taskData.models);
+      }
+    }
+  }, []);
+
   // Function to poll task status
   const pollTaskStatus = useCallback((id) => {
     if (!id) return;
@@ -771,24 +838,9 @@ function App() {
         if (taskData.status === 'completed' || taskData.status === 'error') {
           clearInterval(intervalId);
           setPollingInterval(null);
-          setLoading(false);
-          
-          if (taskData.status === 'error') {
-            setError(taskData.error || 'An error occurred during processing');
-          } else {
-            // Store the completed result data
-            setResult(taskData);
-            
-            // Store detected language if available
-            if (taskData.detected_language) {
-              setDetectedLanguage(taskData.detected_language);
-            }
-            
-            // Store model information if available
-            if (taskData.models) {
-              setModelInfo(taskData.models);
-            }
-          }
+          completeTask(taskData);
+        } else if (taskData.stage) {
+          setResult(prev => prev && prev.status === 'processing' ? { ...prev, stage: taskData.stage } : prev);
         }
       } catch (error) {
         console.error('Error polling task status:', error);
@@ -797,7 +849,43 @@ function App() {
     }, 2000); // Poll every 2 seconds
     
     setPollingInterval(intervalId);
-  }, [pollingInterval, openaiApiKey]);
+  }, [pollingInterval, openaiApiKey, completeTask]);
+
+  // Follow a background task through server-sent stage events, polling only if the stream fails
+  const subscribeToTask = useCallback((id) => {
+    if (!id) return;
+    if (taskEventsRef.current) {
+      taskEventsRef.current.close();
+    }
+    if (!window.EventSource) {
+      pollTaskStatus(id);
+      return;
+    }
+    
+    const source = new EventSource(`${API_BASE_URL}/task/${id}/events`);
+    taskEventsRef.current = source;
+    let finished = false;
+    
+    source.addEventListener('stage', (event) => {
+      const data = JSON.parse(event.data);
+      setResult(prev => prev && prev.status === 'processing' ? { ...prev, stage: data.stage } : prev);
+    });
+    const finish = (event) => {
+      finished = true;
+      source.close();
+      taskEventsRef.current = null;
+      completeTask(JSON.parse(event.data));
+    };
+    source.addEventListener('completed', finish);
+    source.addEventListener('failed', finish);
+    source.onerror = () => {
+      if (finished) return;
+      // The stream dropped (e.g. a proxy closed it), keep following the task by polling
+      source.close();
+      taskEventsRef.current = null;
+      pollTaskStatus(id);
+    };
+  }, [pollTaskStatus, completeTask]);
 
   // Effect to save web search setting to localStorage when it changes
   useEffect(() => {
@@ -863,23 +951,63 @@ function App() {
         formData.append('use_web_search', useWebSearch ? 'true' : 'false');
         formData.append('preferred_language', preferredLanguage); // Add preferred language to the request
         
-        response = await axios.post(`${API_BASE_URL}/fact-check-text`, formData, {
-          headers: headers,
+        // Stream the fact-check so the verdict, findings and web searches show up as soon as they are ready
+        const streamHeaders = {};
+        if (openaiApiKey) {
+          streamHeaders['X-OpenAI-Api-Key'] = openaiApiKey;
+        }
+        const streamResponse = await fetch(`${API_BASE_URL}/fact-check-text/stream`, {
+          method: 'POST',
+          body: formData,
+          headers: streamHeaders,
         });
-        
-        // Set result directly for text input (synchronous)
-        setStage(3);
-        setResult(response.data);
-        
-        // Store detected language if available
-        if (response.data.detected_language) {
-          setDetectedLanguage(response.data.detected_language);
+        if (!streamResponse.ok) {
+          const errorData = await streamResponse.json().catch(() => ({}));
+          setError(errorData.detail || 'An error occurred');
+          setLoading(false);
+          return;
         }
         
-        // Store model information if available
-        if (response.data.models) {
-          setModelInfo(response.data.models);
-        }
+        setStage(2);
+        const partial = { findings: [], claims: [], searchCount: 0 };
+        const showPartial = () => setResult({
+          status: 'processing',
+          message: 'Fact-checking your text. Results appear as they are found.',
+          partial: { ...partial }
+        });
+        showPartial();
+        
+        await readEventStream(streamResponse, (event, data) => {
+          if (event === 'verdict' || event === 'conclusion') {
+            Object.assign(partial, data);
+            showPartial();
+          } else if (event === 'finding') {
+            partial.findings = [...partial.findings, data];
+            showPartial();
+          } else if (event === 'claims') {
+            partial.claims = data.claims;
+            showPartial();
+          } else if (event === 'search_result') {
+            partial.searchCount += 1;
+            showPartial();
+          } else if (event === 'result') {
+            setStage(3);
+            setResult(data);
+            
+            // Store detected language if available
+            if (data.detected_language) {
+              setDetectedLanguage(data.detected_language);
+            }
+            
+            // Store model information if available
+            if (data.models) {
+              setModelInfo(data.models);
+            }
+          } else if (event === 'error') {
+            setResult(null);
+            setError(data.detail || 'An error occurred');
+          }
+        });
         
         setLoading(false);
       } else {
@@ -902,14 +1030,15 @@ function App() {
           setTaskId(response.data.task_id);
           setStage(2); // Set to analyzing stage
           
-          // Start polling for task status
-          pollTaskStatus(response.data.task_id);
+          // Follow the task until its result is ready
+          subscribeToTask(response.data.task_id);
           
           // Show a temporary result with processing status
           setResult({
             status: 'processing',
             message: 'Video processing is in progress. Results will appear automatically when ready.',
-            task_id: response.data.task_id
+            task_id: response.data.task_id,
+            stage: 'queued'
           });
         } else {
           // Handle immediate response (images)
@@ -934,7 +1063,7 @@ function App() {
       setError(error.response?.data?.detail || 'An error occurred');
       setLoading(false);
     }
-  }, [file, instagramLink, freeText, inputMode, useWebSearch, pollTaskStatus, preferredLanguage, openaiApiKey]);
+  }, [file, instagramLink, freeText, inputMode, useWebSearch, subscribeToTask, preferredLanguage, openaiApiKey]);
 
   const getFactCheckStatus = useCallback((factCheck) => {
     if (!factCheck) return { status: 'UNKNOWN', color: 'text-yellow-400' };
@@ -1413,7 +1542,7 @@ function App() {
                                 </div>
                                 <div className="text-right">
                                   <span className="text-xs font-semibold inline-block text-blue-600">
-                                    Please wait
+                                    {TASK_STAGE_LABELS[result.stage] || 'Please wait'}
                                   </span>
                                 </div>
                               </div>
@@ -1456,6 +1585,28 @@ function App() {
                             </div>
                           </div>
                           
+                          {/* Partial results streamed in while the fact-check runs */}
+                          {result.partial && (result.partial.verdict || result.partial.findings.length > 0) && (
+                            <div className="w-full max-w-md mt-8 space-y-3" aria-live="polite">
+                              {result.partial.verdict && (
+                                <h4 className="text-lg font-semibold text-gray-800">{result.partial.verdict}</h4>
+                              )}
+                              {result.partial.conclusion && (
+                                <p className="text-gray-600 text-sm">{result.partial.conclusion}</p>
+                              )}
+                              {result.partial.findings.map(finding => (
+                                <div key={finding.index} className="p-3 border border-gray-100 rounded-lg bg-gray-50 text-sm text-gray-700">
+                                  <span className="font-medium">{finding.claim}</span> - <span>{finding.accuracy}</span>
+                                </div>
+                              ))}
+                              {result.partial.claims.length > 0 && (
+                                <p className="text-xs text-gray-500">
+                                  {result.partial.searchCount} of {result.partial.claims.length} web searches complete
+                                </p>
+                              )}
+                            </div>
+                          )}
+                          
                           <p className="text-gray-500 text-sm mt-8">
                             Analysis usually takes 15-30 seconds depending on content length. Results will appear automatically.
                           </p>
@@ -1557,6 +1708,23 @@ function App() {
                               {/* In-Content Advertisement */}
                               <InContentAd />
                               
+                              {result.visual_analysis_html && (
+                                <motion.section 
+                                  whileHover={{ scale: 1.01 }} 
+                                  className="bg-gray-50 rounded-2xl p-6 shadow-sm border border-gray-100"
+                                >
+                                  <h2 className="text-xl font-semibold mb-4 flex items-center text-gray-800">
+                                    <PhotoIcon className="w-6 h-6 mr-2 text-blue-500" aria-hidden="true" />
+                                    Visual Fact Check
+                                  </h2>
+                                  <FactCheckResults 
+                                    htmlContent={result.visual_analysis_html} 
+                                    onShare={handleShare}
+                                    onExport={exportAsPDF}
+                                  />
+                                </motion.section>
+                              )}
+
                               {result.transcription && (
                                 <motion.section 
                                   whileHover={{ scale: 1.01 }} 
@@ -3,22 +3,50 @@ import base64
 import logging
 import time
 import random
-import requests
 import traceback
 import re  # Ensure re is imported at the module level
 import json  # Add json import at the module level
 import uuid  # Add UUID for task tracking
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks, Header
-from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import socket
+import sqlite3
+import unicodedata
+import heapq
+import threading
+import tempfile
+import itertools
+import math
+import multiprocessing
+import importlib.metadata
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, Request, HTTPException, Form, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from moviepy.editor import VideoFileClip
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, AuthenticationError, PermissionDeniedError, BadRequestError
+import httpx
+import http.cookiejar
+import pickle
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import instaloader
-import glob
 import shutil
 from datetime import datetime, timedelta
 import langdetect
+import io
+import mimetypes
+from PIL import Image, ImageOps
+from multipart.multipart import MultipartParser, parse_options_header
+from collections import OrderedDict
+from html import escape
+from urllib.parse import urlparse
+
+# Make langdetect deterministic so the same text always gets the same language
+langdetect.DetectorFactory.seed = 0
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +60,10 @@ logger.info(f"Loading environment from: {env_path}")
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=env_path)
 
+def key_fingerprint(key):
+    """Short hash identifying an API key in logs without revealing any of it"""
+    return "key-" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+
 # Load the API key separately to guarantee we have the correct one
 api_key = None
 try:
@@ -44,8 +76,7 @@ try:
                 break
     
     if api_key:
-        masked_key = api_key[:10] + "..." + api_key[-5:]
-        logger.info(f"Using API key from .env file: {masked_key}")
+        logger.info(f"Using API key from .env file: {key_fingerprint(api_key)}")
         # Set the environment variable explicitly
         os.environ['OPENAI_API_KEY'] = api_key
     else:
@@ -65,26 +96,138 @@ ALLOWED_ORIGINS = [origin.strip() for origin in ALLOWED_ORIGINS_ENV.split(',')]
 # Max retries for Instagram downloads
 INSTAGRAM_MAX_RETRIES = int(os.getenv('INSTAGRAM_MAX_RETRIES', '3'))
 INSTAGRAM_RETRY_DELAY = int(os.getenv('INSTAGRAM_RETRY_DELAY', '2'))
+# Warm Instagram sessions per worker, and how often the shared login is checked and renewed
+INSTAGRAM_SESSION_POOL_SIZE = int(os.getenv('INSTAGRAM_SESSION_POOL_SIZE', '2'))
+INSTAGRAM_SESSION_CHECK_INTERVAL = int(os.getenv('INSTAGRAM_SESSION_CHECK_INTERVAL', '1800'))  # Seconds
+# Checks asked for by failed downloads are spaced at least this far apart
+INSTAGRAM_SESSION_MIN_CHECK_INTERVAL = 300  # Seconds
+INSTAGRAM_SESSION_FILE = os.path.join(os.path.dirname(__file__), "instagram_session")
 
 # Get model names from environment variables with defaults
 FACT_CHECK_MODEL = os.getenv('FACT_CHECK_MODEL', 'gpt-4o-mini')
 IMAGE_ANALYSIS_MODEL = os.getenv('IMAGE_ANALYSIS_MODEL', 'gpt-4o-mini')
 TRANSCRIPTION_MODEL = os.getenv('TRANSCRIPTION_MODEL', 'whisper-1')
 
+# Images are downscaled to this longest edge and re-encoded without metadata before vision calls
+IMAGE_MAX_EDGE = int(os.getenv('IMAGE_MAX_EDGE', '1536'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+
+# Keyframe sampling so video fact-checks also cover on-screen text and charts
+VIDEO_FRAME_ANALYSIS = os.getenv('VIDEO_FRAME_ANALYSIS', 'true').lower() in ('true', 'yes', '1')
+VIDEO_FRAME_MODE = os.getenv('VIDEO_FRAME_MODE', 'scene').lower()  # scene (scene changes) or interval
+VIDEO_FRAME_INTERVAL = float(os.getenv('VIDEO_FRAME_INTERVAL', '5'))  # Seconds between frames in interval mode
+VIDEO_SCENE_THRESHOLD = float(os.getenv('VIDEO_SCENE_THRESHOLD', '0.3'))
+VIDEO_MAX_FRAMES = int(os.getenv('VIDEO_MAX_FRAMES', '6'))
+VIDEO_FRAME_HASH_DISTANCE = int(os.getenv('VIDEO_FRAME_HASH_DISTANCE', '6'))  # Max differing hash bits for near-duplicates
+
+# Audio extraction for transcription: compact mono 16 kHz audio encoded with opus (or mp3)
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+FFPROBE_BINARY = os.getenv('FFPROBE_BINARY', 'ffprobe')
+AUDIO_FORMAT = os.getenv('AUDIO_FORMAT', 'opus').lower()
+AUDIO_BITRATE = os.getenv('AUDIO_BITRATE', '32k')
+# Upload size limit of the transcription API
+TRANSCRIPTION_MAX_MB = int(os.getenv('TRANSCRIPTION_MAX_MB', '25'))
+# Long audio is split near silences into chunks of about this many seconds, transcribed concurrently
+TRANSCRIPTION_CHUNK_SECONDS = int(os.getenv('TRANSCRIPTION_CHUNK_SECONDS', '300'))
+TRANSCRIPTION_CHUNK_OVERLAP = float(os.getenv('TRANSCRIPTION_CHUNK_OVERLAP', '1.0'))  # Seconds shared by neighbouring chunks
+TRANSCRIPTION_CONCURRENCY = int(os.getenv('TRANSCRIPTION_CONCURRENCY', '4'))
+
+# Transcription backend: 'remote' (TRANSCRIPTION_MODEL API), 'local' (Whisper on CPU),
+# or 'auto' (local for clips up to LOCAL_WHISPER_MAX_SECONDS, remote for longer audio)
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'remote').lower()
+# Retry with the other backend when the chosen one fails
+TRANSCRIPTION_FALLBACK = os.getenv('TRANSCRIPTION_FALLBACK', 'true').lower() in ('true', 'yes', '1')
+LOCAL_WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'base')  # tiny, base, small, medium, large
+LOCAL_WHISPER_MAX_SECONDS = int(os.getenv('LOCAL_WHISPER_MAX_SECONDS', '120'))
+
 # Fact checking reliability settings
 FACT_CHECK_MAX_RETRIES = int(os.getenv('FACT_CHECK_MAX_RETRIES', '3'))
 FACT_CHECK_RETRY_DELAY = int(os.getenv('FACT_CHECK_RETRY_DELAY', '2'))
 FACT_CHECK_TEMPERATURE = float(os.getenv('FACT_CHECK_TEMPERATURE', '0.2'))
+# 'structured': the model returns JSON constrained by a schema and the server renders the HTML,
+# 'html': the model writes the HTML itself and malformed responses are retried.
+# Models that reject the json_schema response_format are switched to 'html' on the first rejection.
+FACT_CHECK_OUTPUT = os.getenv('FACT_CHECK_OUTPUT', 'structured').lower()
+# With structured output, have the fact-check completion also list the claims to web search instead of
+# making a separate claim extraction call (searches then start once the fact-check is done)
+MERGE_CLAIM_EXTRACTION = os.getenv('MERGE_CLAIM_EXTRACTION', 'false').lower() in ('true', 'yes', '1')
 
 # Web search configuration for fact checking
 USE_WEB_SEARCH = os.getenv('USE_WEB_SEARCH', 'true').lower() in ('true', 'yes', '1')
 WEB_SEARCH_MODEL = os.getenv('WEB_SEARCH_MODEL', 'gpt-4o-search-preview')
 WEB_SEARCH_CONTEXT_SIZE = os.getenv('WEB_SEARCH_CONTEXT_SIZE', 'medium')
+# Max concurrent claim searches per request, and across all requests in this worker
+WEB_SEARCH_CONCURRENCY = int(os.getenv('WEB_SEARCH_CONCURRENCY', '5'))
+WEB_SEARCH_GLOBAL_CONCURRENCY = int(os.getenv('WEB_SEARCH_GLOBAL_CONCURRENCY', '20'))
+# Per-claim web search results persisted in SQLite (cache/web_search.db), shared by all workers and video job processes
+WEB_SEARCH_CACHE_TTL = int(os.getenv('WEB_SEARCH_CACHE_TTL', str(6 * 3600)))  # Seconds
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('WEB_SEARCH_CACHE_MAX_ENTRIES', '2000'))
 
 # Instagram download method configuration
 USE_YTDLP = os.getenv('USE_YTDLP', 'true').lower() in ('true', 'yes', '1')
+# yt-dlp runs as a subprocess killed after YTDLP_TIMEOUT seconds, at most YTDLP_CONCURRENCY at a time per worker
+YTDLP_BINARY = os.getenv('YTDLP_BINARY', 'yt-dlp')
+YTDLP_TIMEOUT = float(os.getenv('YTDLP_TIMEOUT', '120'))
+YTDLP_CONCURRENCY = int(os.getenv('YTDLP_CONCURRENCY', '2'))
 USE_DIRECT_DOWNLOAD = os.getenv('USE_DIRECT_DOWNLOAD', 'true').lower() in ('true', 'yes', '1')
 INSTAGRAM_DEBUG = os.getenv('INSTAGRAM_DEBUG', 'false').lower() in ('true', 'yes', '1')
+# Downloaded Instagram media kept on disk by shortcode, so repeat links skip the download entirely
+INSTAGRAM_CACHE_ENABLED = os.getenv('INSTAGRAM_CACHE_ENABLED', 'true').lower() in ('true', 'yes', '1')
+INSTAGRAM_CACHE_TTL = int(os.getenv('INSTAGRAM_CACHE_TTL', str(24 * 3600)))  # Seconds
+INSTAGRAM_CACHE_MAX_MB = int(os.getenv('INSTAGRAM_CACHE_MAX_MB', '2048'))
+# Direct Instagram page, API and media requests share one connection pool; media is streamed to disk in large chunks
+INSTAGRAM_HTTP_MAX_CONNECTIONS = int(os.getenv('INSTAGRAM_HTTP_MAX_CONNECTIONS', '20'))
+INSTAGRAM_HTTP_TIMEOUT = float(os.getenv('INSTAGRAM_HTTP_TIMEOUT', '30'))  # Seconds
+INSTAGRAM_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Upload bodies are parsed as they arrive and the file is written straight to its final path. Requests whose
+# Content-Length is over the limit are refused before reading, others with HTTP 413 once the file passes it
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', '500'))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Room for the other form fields and multipart framing on top of the file
+UPLOAD_FORM_MAX_BYTES = 64 * 1024
+
+# Result cache for repeated submissions of identical content
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() in ('true', 'yes', '1')
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds
+RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', '200'))
+
+# Task status storage: 'sqlite' shares tasks across workers and restarts, 'memory' keeps them in-process
+TASK_STORE_BACKEND = os.getenv('TASK_STORE_BACKEND', 'sqlite').lower()
+TASK_TTL_HOURS = int(os.getenv('TASK_TTL_HOURS', '24'))
+
+# Video job queue: worker count, max queued jobs before uploads get HTTP 429, and whether jobs run in separate processes
+VIDEO_WORKERS = int(os.getenv('VIDEO_WORKERS', '2'))
+VIDEO_QUEUE_MAX_SIZE = int(os.getenv('VIDEO_QUEUE_MAX_SIZE', '20'))
+VIDEO_WORKER_PROCESSES = os.getenv('VIDEO_WORKER_PROCESSES', 'true').lower() in ('true', 'yes', '1')
+
+# Task event subscriptions (GET /task/{task_id}/events): how often the shared store is re-read for
+# updates made by worker processes, and the keep-alive interval for idle streams
+TASK_EVENTS_POLL_INTERVAL = float(os.getenv('TASK_EVENTS_POLL_INTERVAL', '1.0'))
+TASK_EVENTS_KEEPALIVE = int(os.getenv('TASK_EVENTS_KEEPALIVE', '15'))
+
+# Webhooks: uploads with a callback_url get the final task status POSTed to it
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # Signs payloads in the X-Webhook-Signature header when set
+# Only these hosts when set; when empty, any host that resolves to public addresses only
+WEBHOOK_ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv('WEBHOOK_ALLOWED_HOSTS', '').split(',') if host.strip()]
+WEBHOOK_TIMEOUT = int(os.getenv('WEBHOOK_TIMEOUT', '10'))
+WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', '3'))
+
+# Pooled OpenAI clients: one per API key (LRU, dropped when idle) over a shared HTTP connection pool
+OPENAI_CLIENT_POOL_SIZE = int(os.getenv('OPENAI_CLIENT_POOL_SIZE', '64'))
+OPENAI_CLIENT_IDLE_SECONDS = int(os.getenv('OPENAI_CLIENT_IDLE_SECONDS', '900'))
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))  # Seconds an idle connection is kept open
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '600'))
+
+# /models key validation results are cached per hashed key; invalid keys are re-checked sooner
+API_KEY_VALID_TTL = int(os.getenv('API_KEY_VALID_TTL', '3600'))  # Seconds
+API_KEY_INVALID_TTL = int(os.getenv('API_KEY_INVALID_TTL', '60'))  # Seconds
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv('API_KEY_CACHE_MAX_ENTRIES', '10000'))
+
+# Key required by admin endpoints (sent as X-Admin-Key); admin endpoints are disabled when unset
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
 
 app = FastAPI(root_path="/api", debug=True)
 app.add_middleware(
@@ -95,31 +238,112 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add a function to get OpenAI client with the appropriate key
-def get_openai_client(custom_api_key=None):
-    """Get an OpenAI client with either the custom API key or the server's API key"""
-    # Use custom API key if provided
-    if custom_api_key:
-        logger.info("Using custom API key from request header")
-        return OpenAI(api_key=custom_api_key)
+class OpenAIClientPool:
+    """
+    LRU pool of AsyncOpenAI clients keyed by a SHA-256 of their API key, so raw keys are never dict keys.
+    All clients share one tuned httpx connection pool, so connections and TLS sessions are reused across
+    requests, retries and keys. Clients unused for idle_seconds are dropped.
+    """
     
-    # Fallback to server API key
-    if api_key:
-        masked_key = api_key[:10] + "..." + api_key[-5:]
-        logger.info(f"Using server API key: {masked_key}")
-        return OpenAI(api_key=api_key)
+    def __init__(self, max_size, idle_seconds):
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        # key hash -> [client, last used]; least recently used first
+        self.clients = OrderedDict()
+        self.http_client = None
+        self.loop = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
     
-    # If no API key available, return None
-    logger.warning("No API key available (neither user-provided nor server key)")
-    return None
+    def _create_http_client(self):
+        return DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0)
+        )
+    
+    def get(self, key):
+        """Pooled client for key; must be called from the event loop the client will be used on"""
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            # Connections belong to one event loop, video worker processes run each job on a new one
+            # (and close the pool when it ends); a pool left on a finished loop can only be dropped
+            self.clients.clear()
+            if self.http_client is not None:
+                logger.warning("Discarding OpenAI connection pool of a previous event loop")
+            self.http_client = self._create_http_client()
+            self.loop = loop
+        
+        now = time.monotonic()
+        while self.clients:
+            oldest_hash, (_, last_used) = next(iter(self.clients.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self.clients[oldest_hash]
+            self.evictions += 1
+        
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        entry = self.clients.get(key_hash)
+        if entry is not None:
+            entry[1] = now
+            self.clients.move_to_end(key_hash)
+            self.hits += 1
+            return entry[0]
+        
+        self.misses += 1
+        # Clients are only dropped, never closed, since closing would close the shared connection pool
+        client = AsyncOpenAI(api_key=key, http_client=self.http_client)
+        self.clients[key_hash] = [client, now]
+        if len(self.clients) > self.max_size:
+            self.clients.popitem(last=False)
+            self.evictions += 1
+        logger.info(f"Created OpenAI client for {key_fingerprint(key)}")
+        return client
+    
+    async def close(self):
+        self.clients.clear()
+        if self.http_client is not None and self.loop is asyncio.get_running_loop():
+            await self.http_client.aclose()
+        self.http_client = None
+        self.loop = None
+    
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "max_clients": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+openai_client_pool = OpenAIClientPool(OPENAI_CLIENT_POOL_SIZE, OPENAI_CLIENT_IDLE_SECONDS)
+
+@app.on_event("shutdown")
+async def close_openai_clients():
+    await openai_client_pool.close()
+
+# Add a function to get OpenAI client with the appropriate key
+def get_openai_client(custom_api_key=None):
+    """Get a pooled async OpenAI client with either the custom API key or the server's API key"""
+    key = custom_api_key or api_key
+    if not key:
+        # If no API key available, return None
+        logger.warning("No API key available (neither user-provided nor server key)")
+        return None
+    try:
+        return openai_client_pool.get(key)
+    except RuntimeError:
+        # Outside an event loop (e.g. scripts), use a standalone client
+        return AsyncOpenAI(api_key=key)
 
-# Log API key (redacted) for debugging
 if api_key:
-    masked_key = api_key[:10] + "..." + api_key[-5:]
-    logger.info(f"Using OpenAI API key: {masked_key}")
+    logger.info(f"Using OpenAI API key: {key_fingerprint(api_key)}")
     logger.info(f"Model: {FACT_CHECK_MODEL}")
     logger.info(f"Web Search Model: {WEB_SEARCH_MODEL}")
-    logger.info(f"All env: {dict(os.environ)}")
 else:
     logger.warning("No server OpenAI API key found. The server will require users to provide their own API keys.")
 
@@ -127,8 +351,419 @@ UPLOAD_DIRECTORY = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 os.chmod(UPLOAD_DIRECTORY, 0o755)
 
-# Add a task tracking dictionary
-task_results = {}
+# Per-task scratch workspaces live here, one subdirectory per task
+SCRATCH_DIRECTORY = os.path.join(UPLOAD_DIRECTORY, "scratch")
+os.makedirs(SCRATCH_DIRECTORY, exist_ok=True)
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(__file__), "cache")
+os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+
+def run_sqlite(db_path, operation):
+    """Run operation(conn) in a transaction on a fresh connection, which keeps SQLite safe across threads and processes"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        with conn:
+            return operation(conn)
+    finally:
+        conn.close()
+
+class TaskStore(ABC):
+    """Interface for background task status storage. Every task expires TASK_TTL_HOURS after its last update."""
+    
+    @abstractmethod
+    def get(self, task_id):
+        """Stored data of an unexpired task, or None"""
+    
+    @abstractmethod
+    def set(self, task_id, data):
+        """Store task data, restarting its TTL"""
+    
+    @abstractmethod
+    def cleanup_expired(self):
+        """Remove expired tasks and return how many were removed"""
+
+class MemoryTaskStore(TaskStore):
+    """In-process task store. Only visible to the worker that created the task and lost on restart."""
+    
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.tasks = {}
+        # Min-heap of (expires_at, task_id) so cleanup only touches expired entries
+        self.expiry_heap = []
+        self.lock = threading.Lock()
+    
+    def get(self, task_id):
+        with self.lock:
+            entry = self.tasks.get(task_id)
+            if entry is None or entry[0] <= time.time():
+                return None
+            return entry[1]
+    
+    def set(self, task_id, data):
+        expires_at = time.time() + self.ttl_seconds
+        with self.lock:
+            self.tasks[task_id] = (expires_at, data)
+            heapq.heappush(self.expiry_heap, (expires_at, task_id))
+    
+    def cleanup_expired(self):
+        now = time.time()
+        removed = 0
+        with self.lock:
+            while self.expiry_heap and self.expiry_heap[0][0] <= now:
+                expires_at, task_id = heapq.heappop(self.expiry_heap)
+                entry = self.tasks.get(task_id)
+                # Skip heap entries made stale by a later update of the same task
+                if entry is not None and entry[0] == expires_at:
+                    del self.tasks[task_id]
+                    removed += 1
+        return removed
+
+class SQLiteTaskStore(TaskStore):
+    """Task store in a WAL-mode SQLite database, shared by all workers on the host and kept across restarts"""
+    
+    def __init__(self, db_path, ttl_seconds):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        run_sqlite(self.db_path, self._create_schema)
+    
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_expires_at ON tasks (expires_at)")
+    
+    def get(self, task_id):
+        row = run_sqlite(self.db_path, lambda conn: conn.execute(
+            "SELECT data FROM tasks WHERE task_id = ? AND expires_at > ?", (task_id, time.time())
+        ).fetchone())
+        return json.loads(row[0]) if row else None
+    
+    def set(self, task_id, data):
+        payload = json.dumps(data)
+        expires_at = time.time() + self.ttl_seconds
+        run_sqlite(self.db_path, lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, data, expires_at) VALUES (?, ?, ?)", (task_id, payload, expires_at)
+        ))
+    
+    def cleanup_expired(self):
+        return run_sqlite(self.db_path, lambda conn: conn.execute(
+            "DELETE FROM tasks WHERE expires_at <= ?", (time.time(),)
+        ).rowcount)
+
+def create_task_store():
+    ttl_seconds = TASK_TTL_HOURS * 3600
+    if TASK_STORE_BACKEND == 'memory':
+        return MemoryTaskStore(ttl_seconds)
+    if TASK_STORE_BACKEND != 'sqlite':
+        logger.warning(f"Unknown TASK_STORE_BACKEND '{TASK_STORE_BACKEND}', using sqlite")
+    return SQLiteTaskStore(os.path.join(CACHE_DIRECTORY, "tasks.db"), ttl_seconds)
+
+task_store = create_task_store()
+
+class TaskEventNotifier:
+    """
+    Wakes event stream subscribers of a task when this process stores an update for it.
+    Updates stored by worker processes are picked up by the subscribers re-reading the store.
+    """
+    
+    def __init__(self):
+        self.waiters = {}
+    
+    async def wait(self, task_id, timeout):
+        """Wait until the task is updated in this process, or until the timeout passes"""
+        event = asyncio.Event()
+        self.waiters.setdefault(task_id, set()).add(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self.waiters.get(task_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self.waiters[task_id]
+    
+    def notify(self, task_id):
+        for event in self.waiters.get(task_id, ()):
+            event.set()
+
+task_events = TaskEventNotifier()
+
+async def save_task(task_id, data):
+    """Store task status without blocking the event loop"""
+    await asyncio.to_thread(task_store.set, task_id, data)
+    task_events.notify(task_id)
+    logger.info(f"Stored {data.get('status')} status for task {task_id}")
+
+async def set_task_stage(task_id, stage):
+    """Record which pipeline stage a running task has reached"""
+    if task_id:
+        await save_task(task_id, {
+            "status": "processing",
+            "stage": stage,
+            "timestamp": datetime.now().isoformat()
+        })
+
+class ResultCache:
+    """SQLite store of finished fact-check results keyed by content hash, with TTL and size-bounded LRU eviction"""
+    
+    def __init__(self, db_path, ttl_seconds, max_bytes):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._run(self._create_schema)
+    
+    def _run(self, operation):
+        return run_sqlite(self.db_path, operation)
+    
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at)")
+    
+    def get(self, key):
+        def operation(conn):
+            row = conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+        return self._run(operation)
+    
+    def set(self, key, value):
+        data = json.dumps(value)
+        def operation(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            # Evict least recently used entries until the store fits its size budget
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total_size > self.max_bytes:
+                evicted = []
+                for old_key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+                    if total_size <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    total_size -= size
+                conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+                logger.info(f"Evicted {len(evicted)} cached results to stay under {self.max_bytes} bytes")
+        self._run(operation)
+    
+    def invalidate(self, key=None):
+        """Remove one entry, or every entry when no key is given. Returns the number removed."""
+        if key:
+            return self._run(lambda conn: conn.execute("DELETE FROM results WHERE key = ?", (key,)).rowcount)
+        return self._run(lambda conn: conn.execute("DELETE FROM results").rowcount)
+    
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        return self._run(lambda conn: conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,)).rowcount)
+
+result_cache = ResultCache(os.path.join(CACHE_DIRECTORY, "results.db"), RESULT_CACHE_TTL, RESULT_CACHE_MAX_MB * 1024 * 1024) if RESULT_CACHE_ENABLED else None
+
+def hash_text(text):
+    """Hash text after normalizing unicode and collapsing whitespace"""
+    normalized = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def hash_file(file_path):
+    """Hash a file's bytes in chunks (blocking)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def upload_destination(filename):
+    """Final path for an uploaded file, after checking its type and, for videos, that the job queue has room"""
+    file_extension = os.path.splitext(filename)[1].lower()
+    # Normalize extensions by removing the dot if present in the environment variable
+    allowed_extensions_env = os.getenv('ALLOWED_FILE_TYPES', 'mp4,mov,avi,jpg,jpeg,png,gif')
+    allowed_extensions = [ext.strip().lower() for ext in allowed_extensions_env.split(',')]
+    allowed_extensions = [ext if ext.startswith('.') else f'.{ext}' for ext in allowed_extensions]
+    
+    # Check if the file extension is allowed
+    if file_extension not in allowed_extensions:
+        raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed types: {', '.join(ext.lstrip('.') for ext in allowed_extensions)}")
+    
+    # Turn videos away before storing them if the job queue is already full
+    if file_extension in ('.mp4', '.mov', '.avi') and video_queue.is_full():
+        raise_queue_full()
+    
+    return os.path.join(UPLOAD_DIRECTORY, f"upload_{uuid.uuid4().hex}{file_extension}")
+
+async def receive_upload(request):
+    """
+    Parse a multipart/form-data body from the request stream as it arrives, writing the "file" part straight
+    to the path upload_destination picks for it, with no spooled copy in between.
+    MAX_UPLOAD_MB is checked against Content-Length before reading and against the file bytes as they arrive.
+    Other bodies, e.g. application/x-www-form-urlencoded with a url, carry only small text fields and are parsed whole.
+    Returns (form fields, file path or None, sha256 of the file or None).
+    """
+    max_bytes = MAX_UPLOAD_MB * 1024 * 1024
+    too_large = HTTPException(status_code=413, detail=f"File is too large. Maximum upload size is {MAX_UPLOAD_MB} MB")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + UPLOAD_FORM_MAX_BYTES:
+        raise too_large
+    
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data":
+        if content_length.isdigit() and int(content_length) > UPLOAD_FORM_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Form is too large")
+        form = await request.form()
+        return {name: value for name, value in form.items() if isinstance(value, str)}, None, None
+    if not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Multipart request is missing its boundary")
+    
+    # The parser reports through synchronous callbacks; events are collected and handled after each chunk
+    events = []
+    header_field, header_value, part_headers = bytearray(), bytearray(), []
+    
+    def on_header_end():
+        part_headers.append((bytes(header_field).lower(), bytes(header_value)))
+        header_field.clear()
+        header_value.clear()
+    
+    def on_headers_finished():
+        events.append(("headers", dict(part_headers)))
+        part_headers.clear()
+    
+    parser = MultipartParser(options[b"boundary"], {
+        "on_header_field": lambda data, start, end: header_field.extend(data[start:end]),
+        "on_header_value": lambda data, start, end: header_value.extend(data[start:end]),
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None))
+    })
+    
+    fields = {}
+    media_path = media_file = digest = None
+    media_complete = False
+    size = 0
+    part = None  # 'file', 'field' or None for parts that are ignored
+    field_name, buffer = None, bytearray()
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == "headers":
+                    _, disposition = parse_options_header(value.get(b"content-disposition"))
+                    field_name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                    filename = disposition.get(b"filename")
+                    buffer.clear()
+                    if filename is None:
+                        part = 'field'
+                    elif field_name == 'file' and filename and media_path is None:
+                        media_path = upload_destination(filename.decode("utf-8", "replace"))
+                        media_file = open(media_path, "wb")
+                        digest = hashlib.sha256()
+                        part = 'file'
+                    else:
+                        # Empty file inputs and any further files
+                        part = None
+                elif kind == "data" and part == 'file':
+                    size += len(value)
+                    if size > max_bytes:
+                        raise too_large
+                    digest.update(value)
+                    buffer.extend(value)
+                    if len(buffer) >= UPLOAD_CHUNK_BYTES:
+                        await asyncio.to_thread(media_file.write, bytes(buffer))
+                        buffer.clear()
+                elif kind == "data" and part == 'field':
+                    buffer.extend(value)
+                    if len(buffer) > UPLOAD_FORM_MAX_BYTES:
+                        raise HTTPException(status_code=413, detail=f"Form field {field_name} is too large")
+                elif kind == "end":
+                    if part == 'file':
+                        await asyncio.to_thread(media_file.write, bytes(buffer))
+                        media_file.close()
+                        media_complete = True
+                    elif part == 'field':
+                        fields[field_name] = buffer.decode("utf-8", "replace")
+                    part = None
+            events.clear()
+        parser.finalize()
+        if media_path and not media_complete:
+            raise HTTPException(status_code=400, detail="The upload ended before the file was complete")
+    except Exception:
+        # Never leave a partial upload behind
+        if media_file is not None:
+            media_file.close()
+        if media_path and os.path.exists(media_path):
+            os.remove(media_path)
+        raise
+    if media_path:
+        logger.info(f"Streamed {size} bytes to {media_path}")
+    return fields, media_path, digest.hexdigest() if digest else None
+
+def make_cache_key(content_hash, context, should_use_web_search, preferred_language):
+    """Build the result cache key from the content hash and every setting that changes the result"""
+    key_data = json.dumps({
+        "content": content_hash,
+        "context": context,
+        "models": [TRANSCRIPTION_MODEL, FACT_CHECK_MODEL, IMAGE_ANALYSIS_MODEL, WEB_SEARCH_MODEL],
+        "preferred_language": preferred_language or 'auto',
+        "web_search": bool(should_use_web_search),
+    }, sort_keys=True)
+    return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+async def get_cached_result(cache_key):
+    """Look up a cached result, marked as a cache hit. Cache failures never fail the request."""
+    if result_cache is None or not cache_key:
+        return None
+    try:
+        cached_result = await asyncio.to_thread(result_cache.get, cache_key)
+    except Exception as e:
+        logger.warning(f"Error reading result cache: {str(e)}")
+        return None
+    if cached_result is not None:
+        logger.info(f"Result cache hit: {cache_key}")
+        cached_result["cache"] = {"status": "hit", "key": cache_key}
+    return cached_result
+
+def is_error_html(html):
+    """Whether fact-check HTML is an error report from generate_error_fact_check"""
+    return 'class="fact-check error"' in (html or "")
+
+async def store_cached_result(cache_key, result):
+    """Cache a successful result. Error results are not cached so the next submission retries."""
+    if result_cache is None or not cache_key:
+        return
+    html = result.get("fact_check_html") or result.get("image_analysis") or ""
+    web_search_errors = any(isinstance(item, dict) and item.get("error") for item in (result.get("web_search_results") or []))
+    if not html or is_error_html(html) or is_error_html(result.get("visual_analysis_html")) or web_search_errors:
+        return
+    try:
+        await asyncio.to_thread(result_cache.set, cache_key, result)
+    except Exception as e:
+        logger.warning(f"Error writing result cache: {str(e)}")
+
+def cache_status(cache_key):
+    """Cache metadata attached to freshly computed responses"""
+    return {"status": "miss" if result_cache is not None else "disabled", "key": cache_key}
 
 def cleanup_old_files():
     current_time = datetime.now()
@@ -139,8 +774,257 @@ def cleanup_old_files():
             if current_time - file_modified > timedelta(hours=24):
                 os.remove(file_path)
                 logging.debug(f"Removed old file: {file_path}")
+    # Workspaces are removed when their task finishes; this catches ones left by a crashed worker
+    for dirname in os.listdir(SCRATCH_DIRECTORY):
+        workspace = os.path.join(SCRATCH_DIRECTORY, dirname)
+        if os.path.isdir(workspace) and current_time - datetime.fromtimestamp(os.path.getmtime(workspace)) > timedelta(hours=24):
+            shutil.rmtree(workspace, ignore_errors=True)
+            logging.debug(f"Removed stale workspace: {workspace}")
+
+FACT_CHECK_SYSTEM_PROMPT = "You are a meticulous fact-checker with expertise in verification and source evaluation. Always prioritize accuracy over completeness. If you're unsure about any information, clearly state 'I don't know' or 'Unable to verify'. Only use highly reliable sources for verification. Be extremely careful with URLs - only include stable, permanent links from established websites. When in doubt about a URL's permanence, provide the source description without a URL. Detect and respond in the same language as the input content. Your response language should match the language of the content you're fact-checking. Never fabricate sources or information - if information cannot be verified, admit this limitation."
+IMAGE_ANALYSIS_SYSTEM_PROMPT = "You are a meticulous image fact-checker with expertise in verification, digital forensics, and source evaluation. Analyze images for factual claims and potential misinformation. Prioritize accuracy over completeness. If you're unsure about any information, clearly state 'Unable to verify'. Be extremely careful with URLs - only include stable, permanent links from established websites. When in doubt about a URL's permanence, provide the source description without a URL. Detect and respond in the same language as the content shown in the image. If there is text in the image, your response language should match that language EXACTLY. If no text is visible, respond in the language of the accompanying query or default to English. Check for signs of AI-generation or manipulation in images. Never fabricate sources or information - if information cannot be verified, admit this limitation."
+
+FACT_CHECK_VERDICTS = ["INCONCLUSIVE", "MOSTLY ACCURATE", "MOSTLY INACCURATE", "MIXED"]
+IMAGE_VERDICTS = ["ACCURATE", "INACCURATE", "MANIPULATED", "SATIRICAL", "UNVERIFIABLE", "MIXED"]
+CLAIM_ACCURACY_LEVELS = ["Accurate", "Mostly Accurate", "Partly Accurate", "Mostly Inaccurate", "Inaccurate", "Unable to verify"]
+
+# Strict schemas: every property is required and nullable values are typed explicitly
+FACT_CHECK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": FACT_CHECK_VERDICTS},
+        "conclusion": {"type": "string"},
+        "sources": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string", "description": "Source name - Publication date - Title"},
+                    "url": {"type": ["string", "null"], "description": "Stable URL, or null when none is known"}
+                },
+                "required": ["description", "url"],
+                "additionalProperties": False
+            }
+        },
+        "findings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "claim": {"type": "string"},
+                    "accuracy": {"type": "string", "enum": CLAIM_ACCURACY_LEVELS},
+                    "explanation": {"type": "string"}
+                },
+                "required": ["claim", "accuracy", "explanation"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["verdict", "conclusion", "sources", "findings"],
+    "additionalProperties": False
+}
+
+IMAGE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": IMAGE_VERDICTS},
+        "image_content": {"type": "string"},
+        "text_content": {"type": "string"},
+        "analysis": {"type": "string"},
+        "manipulation": {"type": "string"},
+        "conclusion": {"type": "string"},
+        "detected_language": {"type": "string", "description": "ISO 639-1 code of the response language"}
+    },
+    "required": ["verdict", "image_content", "text_content", "analysis", "manipulation", "conclusion", "detected_language"],
+    "additionalProperties": False
+}
+
+SEARCH_CLAIMS_PROPERTY = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "Up to 5 specific factual claims to verify through web searches, each a direct statement"
+}
+SEARCH_CLAIMS_PROMPT = """
+    Also fill search_claims with up to 5 specific factual claims from the content that can be directly verified through web searches.
+    Formulate each claim as a direct statement (not a question), e.g. "The Eiffel Tower is 330 meters tall".
+    """
+
+STRUCTURED_FACT_CHECK_PROMPT = """
+    Return the result as JSON. List at least one finding. verdict is one of INCONCLUSIVE, MOSTLY ACCURATE, MOSTLY INACCURATE or MIXED
+    and every accuracy uses the English labels above; all other text is in the language of the input text.
+    Set a source's url to null when you cannot give a stable URL.
+    """
+
+def with_search_claims(schema):
+    """Extend a result schema with the claims list used for web search"""
+    return {
+        **schema,
+        "properties": {**schema["properties"], "search_claims": SEARCH_CLAIMS_PROPERTY},
+        "required": schema["required"] + ["search_claims"]
+    }
+
+def structured_response_format(name, schema):
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
 
-def perform_fact_check(text, detected_language=None, should_use_web_search=True, context='video', preferred_language=None, custom_api_key=None):
+class StructuredOutputUnsupported(Exception):
+    """The model rejected the json_schema response_format, the caller falls back to HTML output"""
+
+# Models whose API rejected json_schema response_format; they use HTML output for the rest of the process
+structured_output_rejected_models = set()
+
+def uses_structured_output(model):
+    return FACT_CHECK_OUTPUT == 'structured' and model not in structured_output_rejected_models
+
+def is_structured_output_rejection(model, error):
+    """Whether error is the API refusing json_schema response_format for model, which then switches to HTML output"""
+    if not isinstance(error, BadRequestError):
+        return False
+    if error.param != "response_format" and "response_format" not in str(error):
+        return False
+    if model not in structured_output_rejected_models:
+        structured_output_rejected_models.add(model)
+        logger.warning(f"{model} does not support structured outputs, using HTML output instead")
+    return True
+
+def parse_structured_response(response):
+    """Decode a schema-constrained completion, raising on refusals and truncated output"""
+    choice = response.choices[0]
+    if getattr(choice.message, "refusal", None):
+        raise ValueError(f"Model refused the request: {choice.message.refusal}")
+    if choice.finish_reason == "length":
+        raise ValueError("Structured response was truncated")
+    return json.loads(choice.message.content)
+
+def render_models_section(model_lines):
+    """The 'AI Models Used' block appended to every result"""
+    models_html_list = "\n".join(f"<li><strong>{label}:</strong> {name}</li>" for label, name in model_lines)
+    return f"""
+    <section class="ai-models">
+        <h3>AI Models Used:</h3>
+        <ul>{models_html_list}</ul>
+    </section>
+    """
+
+def render_fact_check_html(result, model_lines):
+    """Render a FACT_CHECK_SCHEMA result as the fact-check HTML the frontend parses"""
+    sources_html = "\n".join(
+        f'<li><a href="{escape(source["url"])}">{escape(source["description"])}</a></li>' if (source["url"] or "").startswith(("http://", "https://"))
+        else f'<li>{escape(source["description"])}</li>'
+        for source in result["sources"]
+    )
+    findings_html = "\n".join(
+        f"""<li>
+            <strong>Claim {index}:</strong>
+            <span class="claim-text">{escape(finding["claim"])}</span> -
+            <span class="accuracy">{escape(finding["accuracy"])}</span>
+            <p class="explanation">{escape(finding["explanation"])}</p>
+        </li>"""
+        for index, finding in enumerate(result["findings"], start=1)
+    )
+    return f"""<div class="fact-check">
+    <h2 class="result">{escape(result["verdict"])}</h2>
+    <section class="analysis">
+        <h3>Conclusion:</h3>
+        <p>{escape(result["conclusion"])}</p>
+    </section>
+    <section class="sources">
+        <h3>Sources:</h3>
+        <ul>{sources_html}</ul>
+    </section>
+    <section class="findings">
+        <h3>Findings:</h3>
+        <ul>{findings_html}</ul>
+    </section>
+    {render_models_section(model_lines)}
+</div>"""
+
+def render_image_analysis_html(result, model_lines):
+    """Render an IMAGE_ANALYSIS_SCHEMA result as the image fact-check HTML"""
+    sections = [
+        ("visual-analysis", "Image Content:", result["image_content"]),
+        ("text-content", "Text in Image:", result["text_content"]),
+        ("analysis", "Fact Check:", result["analysis"]),
+        ("manipulation", "Manipulation Assessment:", result["manipulation"]),
+        ("conclusion", "Conclusion:", result["conclusion"]),
+    ]
+    sections_html = "\n".join(
+        f"""<section class="{css_class}">
+        <h3>{heading}</h3>
+        <p>{escape(text)}</p>
+    </section>"""
+        for css_class, heading, text in sections if text
+    )
+    return f"""<div class="fact-check">
+    <h2 class="result">{escape(result["verdict"])}</h2>
+    {sections_html}
+    {render_models_section(model_lines)}
+</div>"""
+
+def fact_check_model_lines(should_use_web_search, transcription_model=None):
+    """Models credited on a fact check; transcription_model is the model that transcribed the text, if any"""
+    model_lines = []
+    if transcription_model:
+        model_lines.append(("Transcription", transcription_model))
+    model_lines.append(("Fact Checking", FACT_CHECK_MODEL))
+    if should_use_web_search:
+        model_lines.append(("Web Search", WEB_SEARCH_MODEL))
+    return model_lines
+
+def image_model_lines(should_use_web_search):
+    model_lines = [("Image Analysis", IMAGE_ANALYSIS_MODEL)]
+    if should_use_web_search:
+        model_lines.append(("Web Search", WEB_SEARCH_MODEL))
+    return model_lines
+
+async def run_structured_fact_check(prompt, should_use_web_search=True, context='video', custom_api_key=None, return_claims=False, transcription_model=None):
+    """
+    Fact-check with a JSON-schema constrained completion and render the HTML server-side.
+    The schema guarantees the sections, so only API errors are retried.
+    With return_claims, returns (html, search_claims) where search_claims is None on errors.
+    """
+    schema = FACT_CHECK_SCHEMA
+    if return_claims:
+        schema = with_search_claims(schema)
+        prompt += SEARCH_CLAIMS_PROMPT
+    prompt += STRUCTURED_FACT_CHECK_PROMPT
+    max_retries = FACT_CHECK_MAX_RETRIES
+    retry_delay = FACT_CHECK_RETRY_DELAY
+
+    for attempt in range(max_retries):
+        try:
+            client = get_openai_client(custom_api_key)
+            if client is None:
+                error_html = await generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, context, custom_api_key)
+                return (error_html, None) if return_claims else error_html
+
+            response = await client.chat.completions.create(
+                model=FACT_CHECK_MODEL,
+                messages=[
+                    {"role": "system", "content": FACT_CHECK_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=4096,
+                temperature=FACT_CHECK_TEMPERATURE,
+                response_format=structured_response_format("fact_check", schema)
+            )
+            result = parse_structured_response(response)
+            logger.info(f"Structured fact check: {result['verdict']} with {len(result['findings'])} findings")
+            fact_check_html = render_fact_check_html(result, fact_check_model_lines(should_use_web_search, transcription_model))
+            return (fact_check_html, result["search_claims"]) if return_claims else fact_check_html
+
+        except Exception as e:
+            if is_structured_output_rejection(FACT_CHECK_MODEL, e):
+                raise StructuredOutputUnsupported(FACT_CHECK_MODEL) from e
+            logger.error(f"Error in structured fact check (attempt {attempt+1}/{max_retries}): {str(e)}")
+            if attempt < max_retries - 1:
+                logger.info(f"Retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+
+    error_html = await generate_error_fact_check("An error occurred during fact-checking. Please try again later.", should_use_web_search, context)
+    return (error_html, None) if return_claims else error_html
+
+def build_fact_check_prompt(text, detected_language=None, preferred_language=None):
+    """The fact-check instructions and input text, without the response format"""
     language_instruction = ""
     if preferred_language and preferred_language != 'auto':
         # If user specified a language, use that
@@ -183,7 +1067,10 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
     <text_to_check>
     {text}
     </text_to_check>
+    """
+    return prompt
 
+FACT_CHECK_HTML_PROMPT = """
     IMPORTANT! Your response MUST include a findings section with at least one claim analysis.
     The HTML MUST include these exact sections: <h2 class="result">, <section class="analysis">, <section class="sources">, and <section class="findings">.
     The findings section MUST have at least one list item with <span class="claim-text">, <span class="accuracy">, and <p class="explanation"> elements.
@@ -218,6 +1105,20 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
     </div>
     """
 
+async def perform_fact_check(text, detected_language=None, should_use_web_search=True, context='video', preferred_language=None, custom_api_key=None, return_claims=False, transcription_model=None):
+    prompt = build_fact_check_prompt(text, detected_language, preferred_language)
+
+    if uses_structured_output(FACT_CHECK_MODEL):
+        try:
+            return await run_structured_fact_check(prompt, should_use_web_search, context, custom_api_key, return_claims, transcription_model)
+        except StructuredOutputUnsupported:
+            pass
+    if return_claims:
+        # The HTML output has no claims list, callers extract the claims separately
+        return await perform_fact_check(text, detected_language, should_use_web_search, context, preferred_language, custom_api_key, transcription_model=transcription_model), None
+
+    prompt += FACT_CHECK_HTML_PROMPT
+
     # Try up to defined number of times in case of API errors
     max_retries = FACT_CHECK_MAX_RETRIES
     retry_delay = FACT_CHECK_RETRY_DELAY
@@ -229,12 +1130,12 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
             
             # If no client available, return an error
             if client is None:
-                return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, context, custom_api_key)
+                return await generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, context, custom_api_key)
             
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=FACT_CHECK_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are a meticulous fact-checker with expertise in verification and source evaluation. Always prioritize accuracy over completeness. If you're unsure about any information, clearly state 'I don't know' or 'Unable to verify'. Only use highly reliable sources for verification. Be extremely careful with URLs - only include stable, permanent links from established websites. When in doubt about a URL's permanence, provide the source description without a URL. Detect and respond in the same language as the input content. Your response language should match the language of the content you're fact-checking. Never fabricate sources or information - if information cannot be verified, admit this limitation."},
+                    {"role": "system", "content": FACT_CHECK_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=4096,
@@ -254,7 +1155,7 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
             if not fact_check_result or "<div class=\"fact-check\">" not in fact_check_result:
                 logger.warning(f"Invalid fact check result format on attempt {attempt+1}. Retrying...")
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                     continue
             
             # Check if the result contains proper sections
@@ -265,36 +1166,19 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
             if missing_sections:
                 logger.warning(f"Fact check result missing sections: {missing_sections} on attempt {attempt+1}. Retrying...")
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                     continue
                     
             # Additional check for findings content
             if "<section class=\"findings\">" in fact_check_result and "<span class=\"claim-text\">" not in fact_check_result:
                 logger.warning("Findings section exists but doesn't contain any claims. Retrying...")
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                     continue
             
             # Add AI model information to the fact-check result
             if "</div>" in fact_check_result:
-                # Build models section based on context
-                models_list = []
-                if context == 'video':
-                    models_list.append(f"<li><strong>Transcription:</strong> {TRANSCRIPTION_MODEL}</li>")
-                models_list.append(f"<li><strong>Fact Checking:</strong> {FACT_CHECK_MODEL}</li>")
-                if should_use_web_search:
-                    models_list.append(f'<li><strong>Web Search:</strong> {WEB_SEARCH_MODEL}</li>')
-                    
-                # Join the list items into a single string with newlines BEFORE the f-string
-                models_html_list = "\n".join(models_list)
-                
-                models_section = f"""
-                <section class="ai-models">
-                    <h3>AI Models Used:</h3>
-                    <ul>{models_html_list}</ul> 
-                </section>
-                """
-                
+                models_section = render_models_section(fact_check_model_lines(should_use_web_search, transcription_model))
                 fact_check_result = fact_check_result.replace("</div>", f"{models_section}</div>")
             
             return fact_check_result
@@ -303,15 +1187,123 @@ def perform_fact_check(text, detected_language=None, should_use_web_search=True,
             logger.error(f"Error in perform_fact_check (attempt {attempt+1}/{max_retries}): {str(e)}")
             if attempt < max_retries - 1:
                 logger.info(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+                await asyncio.sleep(retry_delay)
             else:
                 # Pass flag and context to error generator
-                return generate_error_fact_check("An error occurred during fact-checking. Please try again later.", should_use_web_search, context)
+                return await generate_error_fact_check("An error occurred during fact-checking. Please try again later.", should_use_web_search, context)
     
     # Pass flag and context to error generator
-    return generate_error_fact_check("Failed to complete fact-checking after multiple attempts.", should_use_web_search, context)
+    return await generate_error_fact_check("Failed to complete fact-checking after multiple attempts.", should_use_web_search, context)
+
+class FactCheckStreamParser:
+    """
+    Picks partial results out of a FACT_CHECK_SCHEMA JSON document while it streams in:
+    the verdict and conclusion once their strings are complete, and each finding once its object is closed.
+    Relies on strict structured output emitting the properties in schema order.
+    """
+    STRING_FIELDS = ("verdict", "conclusion")
+    FINDINGS_START = re.compile(r'"findings"\s*:\s*\[')
+    SEPARATOR = re.compile(r'\s*,?\s*')
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.findings_offset = None
+        self.findings = []
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, delta):
+        """Add a chunk of the response and return the newly completed (event, data) pairs"""
+        self.buffer += delta
+        events = []
+        for field in self.STRING_FIELDS:
+            if field not in self.fields:
+                match = re.search(rf'"{field}"\s*:\s*("(?:[^"\\]|\\.)*")', self.buffer)
+                if match:
+                    self.fields[field] = json.loads(match.group(1))
+                    events.append((field, {field: self.fields[field]}))
+        if self.findings_offset is None:
+            match = self.FINDINGS_START.search(self.buffer)
+            if match:
+                self.findings_offset = match.end()
+        while self.findings_offset is not None:
+            start = self.SEPARATOR.match(self.buffer, self.findings_offset).end()
+            if not self.buffer.startswith("{", start):
+                break
+            try:
+                finding, end = self.decoder.raw_decode(self.buffer, start)
+            except json.JSONDecodeError:
+                break  # Object not complete yet
+            self.findings_offset = end
+            self.findings.append(finding)
+            events.append(("finding", dict(finding, index=len(self.findings))))
+        return events
+
+async def stream_fact_check(text, detected_language=None, should_use_web_search=True, context='text', preferred_language=None, custom_api_key=None, emit=None, transcription_model=None):
+    """
+    perform_fact_check with a streamed completion, awaiting emit(event, data) for partial results as they
+    are generated: verdict, conclusion and finding with structured output, raw fact_check_delta chunks with HTML output.
+    Returns the final HTML; if streaming fails it falls back to perform_fact_check and its retries.
+    """
+    client = get_openai_client(custom_api_key)
+    if client is None:
+        return await generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, context, custom_api_key)
+
+    structured = uses_structured_output(FACT_CHECK_MODEL)
+    prompt = build_fact_check_prompt(text, detected_language, preferred_language)
+    prompt += STRUCTURED_FACT_CHECK_PROMPT if structured else FACT_CHECK_HTML_PROMPT
+    request = {
+        "model": FACT_CHECK_MODEL,
+        "messages": [
+            {"role": "system", "content": FACT_CHECK_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 4096,
+        "temperature": FACT_CHECK_TEMPERATURE,
+        "stream": True
+    }
+    if structured:
+        request["response_format"] = structured_response_format("fact_check", FACT_CHECK_SCHEMA)
+    parser = FactCheckStreamParser()
+
+    try:
+        stream = await client.chat.completions.create(**request)
+        content = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            delta = choice.delta.content
+            if not delta:
+                continue
+            content.append(delta)
+            if structured:
+                for event, data in parser.feed(delta):
+                    await emit(event, data)
+            else:
+                await emit("fact_check_delta", {"html": delta})
+        if finish_reason == "length":
+            raise ValueError("Streamed fact check was truncated")
 
-def generate_error_fact_check(error_message, should_use_web_search=True, context='unknown', custom_api_key=None):
+        model_lines = fact_check_model_lines(should_use_web_search, transcription_model)
+        if structured:
+            return render_fact_check_html(json.loads("".join(content)), model_lines)
+        fact_check_result = "".join(content).strip()
+        if '<div class="fact-check">' not in fact_check_result:
+            raise ValueError("Streamed fact check is not in the expected format")
+        head, _, tail = fact_check_result.rpartition("</div>")
+        return f"{head}{render_models_section(model_lines)}</div>{tail}"
+    except Exception as e:
+        # The final result event replaces whatever partial results were already sent
+        logger.error(f"Error streaming fact check, falling back to a regular completion: {str(e)}")
+        if structured:
+            # Models without structured outputs are then fact-checked with HTML output
+            is_structured_output_rejection(FACT_CHECK_MODEL, e)
+        return await perform_fact_check(text, detected_language, should_use_web_search, context, preferred_language, custom_api_key, transcription_model=transcription_model)
+
+async def generate_error_fact_check(error_message, should_use_web_search=True, context='unknown', custom_api_key=None):
     """Generate a dummy fact check response for error cases"""
     try:
         system_prompt = """You are an assistant that generates an HTML error message for a fact checking application. 
@@ -369,7 +1361,7 @@ def generate_error_fact_check(error_message, should_use_web_search=True, context
             </div>
             """
         
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=FACT_CHECK_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -394,15 +1386,144 @@ def generate_error_fact_check(error_message, should_use_web_search=True, context
         </div>
         """
 
-def perform_web_search(search_query, custom_api_key=None):
+class ClaimSearchCache:
+    """
+    Web search results keyed by normalized claim in SQLite, shared by the API workers and the video worker processes.
+    Entries expire after a TTL and the least recently used are evicted beyond max_entries. Hit counts are shared too.
+    """
+    
+    def __init__(self, db_path, ttl_seconds, max_entries):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._run(self._create_schema)
+    
+    def _run(self, operation):
+        return run_sqlite(self.db_path, operation)
+    
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS searches (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_last_access ON searches (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_searches_created_at ON searches (created_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    
+    def _count(self, conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+    
+    def get(self, key):
+        """Cached result for key, or None on a miss (blocking)"""
+        def operation(conn):
+            row = conn.execute("SELECT value, created_at FROM searches WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(conn, "misses")
+                return None
+            conn.execute("UPDATE searches SET last_access = ? WHERE key = ?", (now, key))
+            self._count(conn, "hits")
+            return json.loads(row[0])
+        return self._run(operation)
+    
+    def set(self, key, value):
+        """Store a result, evicting the least recently used entries beyond max_entries (blocking)"""
+        data = json.dumps(value)
+        def operation(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO searches (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, now, now)
+            )
+            excess = conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM searches WHERE key IN (SELECT key FROM searches ORDER BY last_access LIMIT ?)", (excess,)
+                )
+                self._count(conn, "evictions", excess)
+        self._run(operation)
+    
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        return self._run(lambda conn: conn.execute("DELETE FROM searches WHERE created_at < ?", (cutoff,)).rowcount)
+    
+    def stats(self):
+        """Entry count and hit counts across every process using the cache (blocking)"""
+        def operation(conn):
+            entries = conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+            return entries, dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, counters = self._run(operation)
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+web_search_cache = ClaimSearchCache(os.path.join(CACHE_DIRECTORY, "web_search.db"), WEB_SEARCH_CACHE_TTL, WEB_SEARCH_CACHE_MAX_ENTRIES)
+
+def normalize_claim(claim):
+    """Case-fold a claim and collapse punctuation and whitespace so trivially different phrasings share a key"""
+    text = unicodedata.normalize('NFKC', claim).casefold()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def claim_cache_key(claim):
+    """Language-tagged normalized claim, so identical wording in different languages stays separate"""
+    try:
+        language = langdetect.detect(claim)
+    except Exception:
+        language = 'unknown'
+    return f"{language}:{normalize_claim(claim)}"
+
+async def perform_web_search(search_query, custom_api_key=None):
     """
     Perform a web search using OpenAI's web search capabilities.
     Returns a structured result with the search query, results, and sources.
+    Successful results are memoized per normalized claim in web_search_cache; cache failures never fail the search.
     """
     if not USE_WEB_SEARCH:
         logger.warning("Web search is disabled. Skipping search for: " + search_query)
         return None
     
+    cache_key = claim_cache_key(search_query)
+    try:
+        cached_result = await asyncio.to_thread(web_search_cache.get, cache_key)
+    except Exception as e:
+        logger.warning(f"Error reading web search cache: {str(e)}")
+        cached_result = None
+    if cached_result is not None:
+        logger.info(f"Web search cache hit for claim: {search_query}")
+        return dict(cached_result, search_query=search_query)
+    
+    search_result = await run_web_search(search_query, custom_api_key)
+    # Only cache real search results, not the no-search fallback answers
+    if search_result.get("results") and search_result.get("model") == WEB_SEARCH_MODEL:
+        try:
+            await asyncio.to_thread(web_search_cache.set, cache_key, search_result)
+        except Exception as e:
+            logger.warning(f"Error storing web search cache entry: {str(e)}")
+    return search_result
+
+async def run_web_search(search_query, custom_api_key=None):
+    """Call the search model for a single claim, falling back to the fact-check model"""
     try:
         search_prompt = f"""
         Please search the web for information about the following claim:
@@ -432,7 +1553,7 @@ def perform_web_search(search_query, custom_api_key=None):
         if WEB_SEARCH_MODEL == "gpt-4o-search-preview" or "search" in WEB_SEARCH_MODEL:
             # Format for models with built-in web search capability
             try:
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     model=WEB_SEARCH_MODEL,
                     messages=[
                         {"role": "system", "content": "You are a skilled fact-checker and web researcher. Your role is to provide accurate, well-sourced answers to factual questions based on current web information. Always cite your sources with links and provide specific facts rather than general statements."},
@@ -443,12 +1564,13 @@ def perform_web_search(search_query, custom_api_key=None):
                 return {
                     "search_query": search_query,
                     "results": response.choices[0].message.content,
+                    "model": WEB_SEARCH_MODEL,
                     "sources": []
                 }
             except Exception as e:
                 # Fallback to using standard model if search model fails
                 logger.error(f"Error using search model: {str(e)}. Falling back to standard model.")
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     model=FACT_CHECK_MODEL,
                     messages=[
                         {"role": "system", "content": "You are a skilled fact-checker. Your role is to provide what you know about this topic without web search capabilities. Admit when you don't have current information."},
@@ -458,12 +1580,13 @@ def perform_web_search(search_query, custom_api_key=None):
                 return {
                     "search_query": search_query,
                     "results": response.choices[0].message.content,
+                    "model": FACT_CHECK_MODEL,
                     "sources": []
                 }
         else:
             # Fallback for models without web search capability
             logger.warning(f"Model {WEB_SEARCH_MODEL} does not support web search. Using as regular model.")
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=FACT_CHECK_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a skilled fact-checker. Your role is to provide what you know about this topic without web search capabilities. Admit when you don't have current information."},
@@ -473,6 +1596,7 @@ def perform_web_search(search_query, custom_api_key=None):
             return {
                 "search_query": search_query,
                 "results": response.choices[0].message.content,
+                "model": FACT_CHECK_MODEL,
                 "sources": []
             }
     except Exception as e:
@@ -484,37 +1608,255 @@ def perform_web_search(search_query, custom_api_key=None):
             "sources": []
         }
 
-def analyze_image(image_path, should_use_web_search=True, preferred_language=None, custom_api_key=None):
+# Created lazily so it binds to the running event loop (Python 3.9 binds on construction)
+_web_search_semaphore = None
+
+def get_web_search_semaphore():
+    """Get the worker-wide semaphore limiting concurrent web searches"""
+    global _web_search_semaphore
+    if _web_search_semaphore is None:
+        _web_search_semaphore = asyncio.Semaphore(WEB_SEARCH_GLOBAL_CONCURRENCY)
+    return _web_search_semaphore
+
+async def perform_web_searches(claims, custom_api_key=None, on_result=None):
+    """
+    Run perform_web_search for several claims concurrently.
+    Concurrency is capped per request and per worker; results keep the order of the claims.
+    on_result, if given, is awaited with (claim index, result) as each search finishes.
+    """
+    request_semaphore = asyncio.Semaphore(max(1, WEB_SEARCH_CONCURRENCY))
+    global_semaphore = get_web_search_semaphore()
+    
+    async def search_claim(index, claim):
+        async with request_semaphore:
+            async with global_semaphore:
+                result = await perform_web_search(claim, custom_api_key)
+        if result and on_result is not None:
+            await on_result(index, result)
+        return result
+    
+    search_results = await asyncio.gather(*(search_claim(index, claim) for index, claim in enumerate(claims)))
+    return [result for result in search_results if result]
+
+# Per content type: (noun used in the prompt, system prompt description)
+CLAIM_SOURCES = {
+    'text': ("text", "text"),
+    'video': ("transcription", "transcribed content"),
+    'image': ("image", "images"),
+}
+
+def parse_claims(claims_text):
+    """Parse the claims list out of a claims-extraction completion, tolerating non-JSON output"""
     try:
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        # Try to detect language from image text using OCR first (if available)
-        detected_language = None
-        try:
-            # OCR implementation would go here if available
-            # For now, we'll rely on the AI to detect language
-            pass
-        except Exception as e:
-            logger.warning(f"Could not detect language from image: {str(e)}")
-            
-        # Set language instruction based on preferred language
-        language_instruction = ""
-        if preferred_language and preferred_language != 'auto':
-            language_instruction = f"Your response MUST be in {preferred_language} language regardless of any text visible in the image."
-        
-        prompt = f"""
-        Analyze this image and identify any factual claims that can be verified. If text is present, perform a fact-check on that text.
+        claims_obj = json.loads(claims_text)
+        if isinstance(claims_obj, list):
+            return claims_obj
+        factual_claims = claims_obj.get("claims", [])
+        if not factual_claims:
+            logger.warning("No claims extracted from the response")
+        return factual_claims
+    except json.JSONDecodeError as e:
+        # Fallback in case of non-JSON response
+        logger.warning(f"Failed to parse JSON response: {e}")
+        # Try to extract claims using text processing
+        factual_claims = re.findall(r'"([^"]+)"', claims_text)
+        if not factual_claims:
+            # Another fallback method
+            claims_text = claims_text.replace("{", "").replace("}", "").replace("[", "").replace("]", "").replace("\"", "")
+            factual_claims = [line.strip() for line in claims_text.split("\n") if line.strip()]
+        return factual_claims
 
-        1. First, identify the language of any text visible in the image. Your entire response should be in this language.
-        If no text is visible, respond in the language of the accompanying query or default to English.
-        {language_instruction}
-        2. Carefully describe what you see in the image, focusing on elements relevant to factual verification.
-        3. If text is present in the image:
-           a. Extract the main text content
-           b. Identify specific factual claims in the text
-           c. Verify these claims using your knowledge base
-           d. Assess the accuracy of each claim with explanation
+async def extract_claims(content, custom_api_key=None, content_type='text'):
+    """
+    Ask the model for up to 5 verifiable factual claims in the content.
+    content is the input text or transcription, or an image data URL when content_type is 'image'.
+    """
+    noun, description = CLAIM_SOURCES[content_type]
+    claims_prompt = f"""
+    Based on this {noun}, identify 5 specific factual claims that can be directly verified through web searches.
+    Focus on extracting clear, concrete statements that appear in or can be inferred from the {noun}.
+    
+    Format your response as a JSON object with a "claims" field containing an array of strings.
+    Example: {{"claims": ["The Eiffel Tower is 330 meters tall", "Barack Obama was the 44th President of the United States", etc.]}}
+    
+    Important: Formulate each claim as a direct statement (not a question) that can be fact-checked.
+    """
+    
+    if content_type == 'image':
+        model = IMAGE_ANALYSIS_MODEL
+        user_content = [
+            {"type": "text", "text": claims_prompt},
+            {"type": "image_url", "image_url": {"url": content}}
+        ]
+    else:
+        model = FACT_CHECK_MODEL
+        # Use first 2000 chars to keep context manageable
+        user_content = f"{claims_prompt}\n    {noun.capitalize()}:\n    {content[:2000]}"
+    
+    # Get the appropriate OpenAI client
+    client = get_openai_client(custom_api_key)
+    if client is None:
+        raise ValueError("No OpenAI API key available. Please provide your API key in the interface.")
+    
+    claims_response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": f"You are a skilled fact-checker who can identify specific, verifiable factual claims in {description}. Extract only clear, concrete claims that can be verified through web searches."},
+            {"role": "user", "content": user_content}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=500
+    )
+    
+    claims_text = claims_response.choices[0].message.content.strip()
+    logger.info(f"Generated claims from {noun}: {claims_text}")
+    return parse_claims(claims_text)
+
+async def search_extracted_claims(factual_claims, custom_api_key=None, on_result=None):
+    """Web-search claims that are already known, e.g. returned by a merged fact-check completion"""
+    # Search all claims concurrently, results stay in claim order
+    web_search_results = await perform_web_searches(factual_claims[:5], custom_api_key, on_result)  # Limit to 5 claims
+    logger.info(f"Completed {len(web_search_results)} web searches")
+    return web_search_results
+
+async def fact_check_and_search(text, detected_language=None, should_use_web_search=True, context='text', preferred_language=None, custom_api_key=None, on_claims=None, transcription_model=None):
+    """
+    Fact-check text (input or transcription) and web-search its claims, returning (fact_check_html, web_search_results).
+    With MERGE_CLAIM_EXTRACTION the fact-check completion also returns the claims, saving the extraction call;
+    otherwise claim extraction and search run concurrently with the fact-check.
+    on_claims is awaited with the claims when their searches start.
+    transcription_model, the model that transcribed the text, is credited in the fact check.
+    """
+    fact_check_args = (text, detected_language, should_use_web_search, context, preferred_language, custom_api_key)
+    if not should_use_web_search:
+        return await perform_fact_check(*fact_check_args, transcription_model=transcription_model), None
+    if MERGE_CLAIM_EXTRACTION and uses_structured_output(FACT_CHECK_MODEL):
+        fact_check_html, factual_claims = await perform_fact_check(*fact_check_args, return_claims=True, transcription_model=transcription_model)
+        if factual_claims is not None:
+            logger.info(f"Fact-check returned {len(factual_claims)} claims for web search: {factual_claims}")
+            try:
+                if on_claims is not None:
+                    await on_claims(factual_claims[:5])
+                return fact_check_html, await search_extracted_claims(factual_claims, custom_api_key)
+            except Exception as e:
+                logger.error(f"Error during web search for {context}: {str(e)}")
+                return fact_check_html, [{"error": str(e), "search_query": "Error searching claims"}]
+        # The fact-check failed, so fall back to the separate extraction call
+        return fact_check_html, await search_claims(text, custom_api_key, content_type=context, on_claims=on_claims)
+    fact_check_html, web_search_results = await asyncio.gather(
+        perform_fact_check(*fact_check_args, transcription_model=transcription_model),
+        search_claims(text, custom_api_key, content_type=context, on_claims=on_claims)
+    )
+    return fact_check_html, web_search_results
+
+async def search_claims(content, custom_api_key=None, content_type='text', on_claims=None, on_result=None):
+    """
+    Extract claims from the content and web-search them as soon as they arrive.
+    Only needs the input, so pipelines run it concurrently with the main fact-check.
+    on_claims and on_result are optional callbacks for streaming the claims and each search result.
+    """
+    try:
+        factual_claims = await extract_claims(content, custom_api_key, content_type)
+        logger.info(f"Extracted {len(factual_claims)} claims for web search: {factual_claims}")
+        if on_claims is not None:
+            await on_claims(factual_claims[:5])
+        return await search_extracted_claims(factual_claims, custom_api_key, on_result)
+    except Exception as e:
+        logger.error(f"Error during web search extraction for {content_type}: {str(e)}")
+        return [{"error": str(e), "search_query": "Error extracting search queries"}]
+
+async def run_structured_image_analysis(prompt, image_data_urls, should_use_web_search=True, custom_api_key=None, return_claims=False):
+    """
+    Image counterpart of run_structured_fact_check, returning the same dict as run_image_analysis.
+    With return_claims the dict also carries "search_claims" (None on errors).
+    """
+    prompt += """
+        Return the result as JSON instead of the language tag. verdict is one of ACCURATE, INACCURATE, MANIPULATED, SATIRICAL,
+        UNVERIFIABLE or MIXED; leave text_content empty when no text is visible. All other text follows the language rules above.
+        """
+    schema = IMAGE_ANALYSIS_SCHEMA
+    if return_claims:
+        schema = with_search_claims(schema)
+        prompt += SEARCH_CLAIMS_PROMPT
+    max_retries = FACT_CHECK_MAX_RETRIES
+    retry_delay = FACT_CHECK_RETRY_DELAY
+
+    for attempt in range(max_retries):
+        try:
+            client = get_openai_client(custom_api_key)
+            if client is None:
+                return {
+                    "analysis_result": await generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'image', custom_api_key),
+                    "detected_language": None
+                }
+
+            response = await client.chat.completions.create(
+                model=IMAGE_ANALYSIS_MODEL,
+                messages=[
+                    {"role": "system", "content": IMAGE_ANALYSIS_SYSTEM_PROMPT},
+                    {"role": "user", "content": [{"type": "text", "text": prompt}] + [
+                        {"type": "image_url", "image_url": {"url": url}} for url in image_data_urls
+                    ]}
+                ],
+                max_tokens=1500,
+                temperature=FACT_CHECK_TEMPERATURE,
+                response_format=structured_response_format("image_analysis", schema)
+            )
+            result = parse_structured_response(response)
+            detected_language = result["detected_language"] or None
+            logger.info(f"Structured image analysis: {result['verdict']}, language {detected_language}")
+            return {
+                "analysis_result": render_image_analysis_html(result, image_model_lines(should_use_web_search)),
+                "detected_language": detected_language,
+                "search_claims": result.get("search_claims")
+            }
+
+        except Exception as e:
+            if is_structured_output_rejection(IMAGE_ANALYSIS_MODEL, e):
+                raise StructuredOutputUnsupported(IMAGE_ANALYSIS_MODEL) from e
+            logger.error(f"Error in structured image analysis (attempt {attempt+1}/{max_retries}): {str(e)}")
+            if attempt < max_retries - 1:
+                logger.info(f"Retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+
+    return {
+        "analysis_result": await generate_error_fact_check(f"Error analyzing image after {max_retries} attempts", should_use_web_search, 'image'),
+        "detected_language": None
+    }
+
+async def run_image_analysis(image_data_url, should_use_web_search=True, preferred_language=None, custom_api_key=None, return_claims=False):
+    """
+    Fact-check an image data URL with the vision model, retrying on malformed output.
+    A list of data URLs is analyzed together in one request as keyframes of a single video.
+    """
+    image_data_urls = image_data_url if isinstance(image_data_url, list) else [image_data_url]
+    try:
+        # Try to detect language from image text using OCR first (if available)
+        detected_language = None
+        try:
+            # OCR implementation would go here if available
+            # For now, we'll rely on the AI to detect language
+            pass
+        except Exception as e:
+            logger.warning(f"Could not detect language from image: {str(e)}")
+            
+        # Set language instruction based on preferred language
+        language_instruction = ""
+        if preferred_language and preferred_language != 'auto':
+            language_instruction = f"Your response MUST be in {preferred_language} language regardless of any text visible in the image."
+        
+        prompt = f"""
+        Analyze this image and identify any factual claims that can be verified. If text is present, perform a fact-check on that text.
+
+        1. First, identify the language of any text visible in the image. Your entire response should be in this language.
+        If no text is visible, respond in the language of the accompanying query or default to English.
+        {language_instruction}
+        2. Carefully describe what you see in the image, focusing on elements relevant to factual verification.
+        3. If text is present in the image:
+           a. Extract the main text content
+           b. Identify specific factual claims in the text
+           c. Verify these claims using your knowledge base
+           d. Assess the accuracy of each claim with explanation
         4. If there is no text but there are visual claims (charts, graphs, visual representations of statistics, etc.):
            a. Extract the key data points/claims shown visually
            b. Verify these claims if possible
@@ -531,7 +1873,21 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
         - When making a factual assessment, explain why you arrived at that conclusion.
         - If you cannot verify a claim with your knowledge, state "Unable to verify" for that claim.
         - Never fabricate sources or information - if information cannot be verified, admit this limitation.
+        """
+        if len(image_data_urls) > 1:
+            prompt = f"""
+        The {len(image_data_urls)} images below are keyframes sampled in order from a single video.
+        Treat them together as one image: combine on-screen text, charts and visual claims from all frames into a single analysis.
+        """ + prompt
 
+        if uses_structured_output(IMAGE_ANALYSIS_MODEL):
+            try:
+                return await run_structured_image_analysis(prompt, image_data_urls, should_use_web_search, custom_api_key, return_claims)
+            except StructuredOutputUnsupported:
+                # Without search_claims in the result, callers extract the claims separately
+                pass
+
+        prompt += """
         Respond with HTML in this format and in the same language as any text in the image:
         <div class="fact-check">
             <h2 class="result">[ACCURATE, INACCURATE, MANIPULATED, SATIRICAL, UNVERIFIABLE, or MIXED]</h2>
@@ -570,15 +1926,17 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
                 
                 # If no client available, return an error
                 if client is None:
-                    return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'image', custom_api_key)
+                    return {
+                        "analysis_result": await generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'image', custom_api_key),
+                        "detected_language": None
+                    }
                 
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     model=IMAGE_ANALYSIS_MODEL,
                     messages=[
-                        {"role": "system", "content": "You are a meticulous image fact-checker with expertise in verification, digital forensics, and source evaluation. Analyze images for factual claims and potential misinformation. Prioritize accuracy over completeness. If you're unsure about any information, clearly state 'Unable to verify'. Be extremely careful with URLs - only include stable, permanent links from established websites. When in doubt about a URL's permanence, provide the source description without a URL. Detect and respond in the same language as the content shown in the image. If there is text in the image, your response language should match that language EXACTLY. If no text is visible, respond in the language of the accompanying query or default to English. Check for signs of AI-generation or manipulation in images. Never fabricate sources or information - if information cannot be verified, admit this limitation."},
-                        {"role": "user", "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                        {"role": "system", "content": IMAGE_ANALYSIS_SYSTEM_PROMPT},
+                        {"role": "user", "content": [{"type": "text", "text": prompt}] + [
+                            {"type": "image_url", "image_url": {"url": url}} for url in image_data_urls
                         ]}
                     ],
                     max_tokens=1000,
@@ -590,18 +1948,18 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
                 if not analysis_result or "<div class=\"fact-check\">" not in analysis_result:
                     logger.warning(f"Invalid image analysis result format on attempt {attempt+1}. Retrying...")
                     if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                         continue
                 
                 # Check if the result contains proper sections
                 required_sections = ["<h2 class=\"result\">", "<section class=\"analysis\">", 
-                                    "<section class=\"findings\">"]
+                                    "<section class=\"conclusion\">"]
                 missing_sections = [section for section in required_sections if section not in analysis_result]
                 
                 if missing_sections:
                     logger.warning(f"Image analysis result missing sections: {missing_sections} on attempt {attempt+1}. Retrying...")
                     if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                         continue
                 
                 # Extract detected language if available
@@ -624,7 +1982,7 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
                                 if attempt < max_retries - 1:
                                     # Modify prompt to strongly enforce language
                                     prompt += f"\n\nCRITICAL: Your response MUST be in {detected_language} language, not in English or any other language!"
-                                    time.sleep(retry_delay)
+                                    await asyncio.sleep(retry_delay)
                                     continue
                         except Exception as lang_error:
                             logger.warning(f"Error checking response language: {str(lang_error)}")
@@ -639,101 +1997,12 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
                 
                 # Add AI model information to the image analysis result
                 if "</div>" in analysis_result:
-                    # Build models section based on context and flag
-                    models_list = []
-                    models_list.append(f"<li><strong>Image Analysis:</strong> {IMAGE_ANALYSIS_MODEL}</li>")
-                    if should_use_web_search:
-                        models_list.append(f'<li><strong>Web Search:</strong> {WEB_SEARCH_MODEL}</li>')
-                        
-                    # Join the list items into a single string with newlines BEFORE the f-string
-                    models_html_list = "\n".join(models_list)
-                    
-                    models_section = f"""
-                    <section class="ai-models">
-                        <h3>AI Models Used:</h3>
-                        <ul>{models_html_list}</ul> 
-                    </section>
-                    """
-                    
+                    models_section = render_models_section(image_model_lines(should_use_web_search))
                     analysis_result = analysis_result.replace("</div>", f"{models_section}</div>")
                 
-                # If web search is enabled, extract claims and perform web search
-                web_search_results = None
-                if should_use_web_search:
-                    try:
-                        # Extract key factual claims from the image
-                        claims_prompt = """
-                        Based on this image, identify 5 specific factual claims that can be directly verified through web searches.
-                        Focus on extracting clear, concrete statements that appear in or can be inferred from the image.
-                        
-                        Format your response as a JSON object with a "claims" field containing an array of strings.
-                        Example: {"claims": ["The Eiffel Tower is 330 meters tall", "Barack Obama was the 44th President of the United States", etc.]}
-                        
-                        Important: Formulate each claim as a direct statement (not a question) that can be fact-checked.
-                        """
-                        
-                        # Get the appropriate OpenAI client
-                        client = get_openai_client(custom_api_key)
-                        
-                        # If no client available, return an error
-                        if client is None:
-                            return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'image', custom_api_key)
-                        
-                        claims_response = client.chat.completions.create(
-                            model=IMAGE_ANALYSIS_MODEL,
-                            messages=[
-                                {"role": "system", "content": "You are a skilled fact-checker who can identify specific, verifiable factual claims in images. Extract only clear, concrete claims that can be verified through web searches."},
-                                {"role": "user", "content": [
-                                    {"type": "text", "text": claims_prompt},
-                                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                                ]}
-                            ],
-                            response_format={"type": "json_object"},
-                            max_tokens=500
-                        )
-                        
-                        claims_text = claims_response.choices[0].message.content.strip()
-                        logger.info(f"Generated claims from image: {claims_text}")
-                        
-                        # Parse the JSON response
-                        try:
-                            claims_obj = json.loads(claims_text)
-                            factual_claims = claims_obj.get("claims", [])
-                            if not factual_claims:
-                                logger.warning("No claims extracted from the response")
-                                if isinstance(claims_obj, list):
-                                    factual_claims = claims_obj
-                        except json.JSONDecodeError as e:
-                            # Fallback in case of non-JSON response
-                            logger.warning(f"Failed to parse JSON response: {e}")
-                            # Try to extract claims using text processing
-                            claims_pattern = r'"([^"]+)"'
-                            factual_claims = re.findall(claims_pattern, claims_text)
-                            if not factual_claims:
-                                # Another fallback method
-                                claims_text = claims_text.replace("{", "").replace("}", "").replace("[", "").replace("]", "").replace("\"", "")
-                                lines = [line.strip() for line in claims_text.split("\n") if line.strip() and not line.strip().startswith('{') and not line.strip().startswith('}')]
-                                factual_claims = [line for line in lines if line]
-                        
-                        logger.info(f"Extracted {len(factual_claims)} claims for web search: {factual_claims}")
-                        
-                        # Perform web search for each claim
-                        web_search_results = []
-                        for claim in factual_claims[:5]:  # Limit to 5 claims
-                            search_result = perform_web_search(claim, custom_api_key)
-                            if search_result:
-                                web_search_results.append(search_result)
-                        
-                        logger.info(f"Completed {len(web_search_results)} web searches")
-                    
-                    except Exception as e:
-                        logger.error(f"Error during web search extraction: {str(e)}")
-                        web_search_results = [{"error": str(e), "search_query": "Error extracting search queries"}]
-                
                 # Return the analysis result with detected language
                 return {
                     "analysis_result": analysis_result,
-                    "web_search_results": web_search_results,
                     "detected_language": detected_language
                 }
                 
@@ -741,305 +2010,1334 @@ def analyze_image(image_path, should_use_web_search=True, preferred_language=Non
                 logger.error(f"Error analyzing image on attempt {attempt+1}: {str(e)}")
                 if attempt < max_retries - 1:
                     logger.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                 else:
                     # Pass flag and context to error generator
                     return {
-                        "analysis_result": generate_error_fact_check(f"Error analyzing image after {max_retries} attempts: {str(e)}", should_use_web_search, 'image'),
-                        "detected_language": None,
-                        "web_search_results": None
+                        "analysis_result": await generate_error_fact_check(f"Error analyzing image after {max_retries} attempts: {str(e)}", should_use_web_search, 'image'),
+                        "detected_language": None
                     }
     except Exception as outer_e:
-        logger.error(f"Outer error in analyze_image: {str(outer_e)}", exc_info=True)
+        logger.error(f"Outer error in run_image_analysis: {str(outer_e)}", exc_info=True)
         # Pass flag and context to error generator
         return {
-            "analysis_result": generate_error_fact_check(f"Error processing image: {str(outer_e)}", should_use_web_search, 'image'),
+            "analysis_result": await generate_error_fact_check(f"Error processing image: {str(outer_e)}", should_use_web_search, 'image'),
+            "detected_language": None
+        }
+    
+    # Pass flag and context to error generator
+    return {
+        "analysis_result": await generate_error_fact_check("Failed to analyze image after maximum retries", should_use_web_search, 'image'),
+        "detected_language": None
+    }
+
+def prepare_image(image_path):
+    """
+    Build the data URL sent to the vision model (blocking). Pillow detects the real format,
+    applies EXIF orientation, downscales to IMAGE_MAX_EDGE and re-encodes without metadata:
+    JPEG for opaque images, PNG when there is transparency.
+    """
+    try:
+        with Image.open(image_path) as original:
+            source_format = original.format
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            if has_alpha:
+                # Screenshots are usually RGBA with every pixel opaque, those compress far better as JPEG
+                has_alpha = image.convert('RGBA').getchannel('A').getextrema()[0] < 255
+            buffer = io.BytesIO()
+            if has_alpha:
+                image.convert('RGBA').save(buffer, format='PNG', optimize=True)
+                mime_type = 'image/png'
+            else:
+                image.convert('RGB').save(buffer, format='JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True)
+                mime_type = 'image/jpeg'
+            image_bytes = buffer.getvalue()
+            logger.info(f"Preprocessed {source_format} image {original.size} -> {image.size}: {os.path.getsize(image_path)} -> {len(image_bytes)} bytes")
+    except Exception as e:
+        # Send the file as-is if Pillow can't handle it
+        logger.warning(f"Image preprocessing failed, sending original bytes: {str(e)}")
+        with open(image_path, "rb") as image_file:
+            image_bytes = image_file.read()
+        mime_type = mimetypes.guess_type(image_path)[0] or 'image/jpeg'
+    return f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode('utf-8')}"
+
+async def analyze_image(image_path, should_use_web_search=True, preferred_language=None, custom_api_key=None):
+    """
+    Fact-check an image file. The preprocessed payload is built once and shared by the analysis and
+    claim extraction calls, which run concurrently since claim extraction only needs the image
+    (or are a single call with MERGE_CLAIM_EXTRACTION).
+    """
+    try:
+        image_data_url = await asyncio.to_thread(prepare_image, image_path)
+    except Exception as e:
+        logger.error(f"Error reading image {image_path}: {str(e)}", exc_info=True)
+        return {
+            "analysis_result": await generate_error_fact_check(f"Error processing image: {str(e)}", should_use_web_search, 'image'),
             "detected_language": None,
             "web_search_results": None
         }
     
-    # Pass flag and context to error generator
+    if should_use_web_search and MERGE_CLAIM_EXTRACTION and uses_structured_output(IMAGE_ANALYSIS_MODEL):
+        # One vision call returns both the analysis and the claims to search
+        image_analysis = await run_image_analysis(image_data_url, should_use_web_search, preferred_language, custom_api_key, return_claims=True)
+        factual_claims = image_analysis.pop("search_claims", None)
+        if factual_claims is not None:
+            try:
+                web_search_results = await search_extracted_claims(factual_claims, custom_api_key)
+            except Exception as e:
+                logger.error(f"Error during web search for image: {str(e)}")
+                web_search_results = [{"error": str(e), "search_query": "Error searching claims"}]
+        else:
+            web_search_results = await search_claims(image_data_url, custom_api_key, content_type='image')
+        image_analysis["web_search_results"] = web_search_results
+        return image_analysis
+
+    analysis_coro = run_image_analysis(image_data_url, should_use_web_search, preferred_language, custom_api_key)
+    if should_use_web_search:
+        image_analysis, web_search_results = await asyncio.gather(
+            analysis_coro,
+            search_claims(image_data_url, custom_api_key, content_type='image')
+        )
+    else:
+        image_analysis = await analysis_coro
+        web_search_results = None
+    
+    image_analysis["web_search_results"] = web_search_results
+    return image_analysis
+
+# Containers for audio codecs the transcription API accepts as-is, so the track can be stream copied
+AUDIO_COPY_CONTAINERS = {'aac': 'm4a', 'mp3': 'mp3', 'opus': 'ogg', 'vorbis': 'ogg', 'flac': 'flac'}
+# AUDIO_FORMAT -> (ffmpeg encoder, file extension)
+AUDIO_ENCODERS = {'opus': ('libopus', 'ogg'), 'mp3': ('libmp3lame', 'mp3')}
+
+async def run_media_tool(args, timeout=None):
+    """
+    Run ffmpeg/ffprobe (or yt-dlp) as an asyncio subprocess and return its (stdout, stderr).
+    The process is killed when it runs longer than timeout seconds or the caller is cancelled.
+    """
+    process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException as e:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise RuntimeError(f"{os.path.basename(args[0])} timed out after {timeout} seconds")
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(args[0])} failed with code {process.returncode}: {stderr.decode(errors='replace')[-500:]}")
+    return stdout, stderr
+
+async def probe_audio_stream(media_path):
+    """Codec, bit rate and duration of the first audio stream, or None if there is no audio"""
+    output, _ = await run_media_tool([
+        FFPROBE_BINARY, "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,bit_rate:format=duration", "-of", "json", media_path
+    ])
+    info = json.loads(output or b"{}")
+    streams = info.get("streams") or []
+    if not streams:
+        return None
     return {
-        "analysis_result": generate_error_fact_check("Failed to analyze image after maximum retries", should_use_web_search, 'image'),
-        "detected_language": None,
-        "web_search_results": None
+        "codec": streams[0].get("codec_name"),
+        "bit_rate": int(streams[0].get("bit_rate") or 0),
+        "duration": float(info.get("format", {}).get("duration") or 0)
     }
 
-async def process_video(video_path, should_use_web_search=True, task_id=None, preferred_language='auto', custom_api_key=None):
+async def extract_audio(video_path, workspace):
+    """
+    Extract the audio track for transcription with ffmpeg and return the written path.
+    Tracks already in a codec the API accepts are stream copied when they fit its upload limit,
+    everything else is encoded straight to compact mono 16 kHz audio without an intermediate WAV.
+    """
+    stream = await probe_audio_stream(video_path)
+    if stream is None:
+        raise ValueError("The video has no audio track to transcribe")
+    
+    container = AUDIO_COPY_CONTAINERS.get(stream["codec"])
+    estimated_bytes = stream["bit_rate"] * stream["duration"] / 8
+    if container and stream["bit_rate"] and estimated_bytes < TRANSCRIPTION_MAX_MB * 1024 * 1024:
+        audio_path = os.path.join(workspace, f"audio.{container}")
+        try:
+            await run_media_tool([FFMPEG_BINARY, "-nostdin", "-v", "error", "-y", "-i", video_path, "-map", "0:a:0", "-vn", "-c:a", "copy", audio_path])
+            logger.info(f"Stream copied {stream['codec']} audio to {audio_path} ({os.path.getsize(audio_path)} bytes)")
+            return audio_path
+        except RuntimeError as e:
+            logger.warning(f"Audio stream copy failed, re-encoding instead: {str(e)}")
+    
+    encoder, extension = AUDIO_ENCODERS.get(AUDIO_FORMAT, AUDIO_ENCODERS['opus'])
+    audio_path = os.path.join(workspace, f"audio.{extension}")
+    await run_media_tool([
+        FFMPEG_BINARY, "-nostdin", "-v", "error", "-y", "-i", video_path, "-map", "0:a:0", "-vn",
+        "-ac", "1", "-ar", "16000", "-c:a", encoder, "-b:a", AUDIO_BITRATE, audio_path
+    ])
+    logger.info(f"Encoded {stream['codec']} audio to {audio_path} ({os.path.getsize(audio_path)} bytes)")
+    return audio_path
+
+async def detect_silences(audio_path):
+    """Midpoints, in seconds, of the silent stretches in an audio file"""
+    _, stderr = await run_media_tool([
+        FFMPEG_BINARY, "-nostdin", "-v", "info", "-i", audio_path,
+        "-af", "silencedetect=noise=-35dB:d=0.4", "-f", "null", "-"
+    ])
+    log = stderr.decode(errors='replace')
+    starts = [float(value) for value in re.findall(r'silence_start: (-?[\d.]+)', log)]
+    ends = [float(value) for value in re.findall(r'silence_end: ([\d.]+)', log)]
+    return [(start + end) / 2 for start, end in zip(starts, ends)]
+
+def choose_chunk_boundaries(duration, silences):
+    """
+    Cut points for splitting audio into chunks of about TRANSCRIPTION_CHUNK_SECONDS.
+    Each cut moves to the nearest silence within 20% of the target so words aren't split.
+    """
+    chunk_seconds = TRANSCRIPTION_CHUNK_SECONDS
+    boundaries = [0.0]
+    # Stop early enough that the last chunk isn't a tiny tail
+    while duration - boundaries[-1] > chunk_seconds * 1.2:
+        target = boundaries[-1] + chunk_seconds
+        candidates = [silence for silence in silences if abs(silence - target) <= chunk_seconds * 0.2]
+        boundaries.append(min(candidates, key=lambda silence: abs(silence - target)) if candidates else target)
+    boundaries.append(duration)
+    return boundaries
+
+async def transcribe_file(client, audio_path):
+    """Transcribe one audio file with verbose_json output, returned as a plain dict"""
+    with open(audio_path, "rb") as audio_file:
+        transcription = await client.audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL, 
+            file=audio_file,
+            response_format="verbose_json"  # Get verbose response to access language info and segments
+        )
+    return transcription.model_dump()
+
+def stitch_transcriptions(boundaries, chunk_offsets, transcriptions):
+    """
+    Join chunk transcriptions into one. Segment timestamps are shifted to the full audio timeline,
+    and a segment from an overlap is only kept by the chunk whose own range contains its midpoint.
+    """
+    segments = []
+    texts = []
+    language_weights = {}
+    for index, (offset, transcription) in enumerate(zip(chunk_offsets, transcriptions)):
+        own_start, own_end = boundaries[index], boundaries[index + 1]
+        is_last = index == len(transcriptions) - 1
+        chunk_text = []
+        for segment in transcription.get("segments") or []:
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            midpoint = (start + end) / 2
+            if own_start <= midpoint and (midpoint < own_end or is_last):
+                segments.append({"start": round(start, 2), "end": round(end, 2), "text": segment["text"].strip()})
+                chunk_text.append(segment["text"].strip())
+        # Rebuild the text from kept segments only when overlaps had to be trimmed
+        if len(transcriptions) > 1 and transcription.get("segments"):
+            text = " ".join(chunk_text)
+        else:
+            text = (transcription.get("text") or "").strip()
+        texts.append(text)
+        # The language spoken in most of the audio wins
+        language = transcription.get("language")
+        if language:
+            language_weights[language] = language_weights.get(language, 0) + len(text)
+    
+    language = max(language_weights, key=language_weights.get) if language_weights else None
+    return {"text": " ".join(text for text in texts if text), "language": language, "segments": segments}
+
+# Loaded on first use, once per worker process
+_local_whisper_model = None
+_local_whisper_lock = threading.Lock()
+# Whisper installs per-call hooks on the model, so a single thread runs local inference
+_local_whisper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+
+def local_whisper_installed():
+    """Whether openai-whisper is installed; it is optional and not part of the default image"""
     try:
-        audio_path = os.path.join(UPLOAD_DIRECTORY, "extracted_audio.wav")
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(audio_path)
-        video.close()
+        importlib.metadata.version("openai-whisper")
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return False
 
-        with open(audio_path, "rb") as audio_file:
-            # Get the appropriate OpenAI client
-            client = get_openai_client(custom_api_key)
-            
-            # If no client available, return an error
-            if client is None:
-                return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'video', custom_api_key)
-            
-            transcription = client.audio.transcriptions.create(
-                model=TRANSCRIPTION_MODEL, 
-                file=audio_file,
-                response_format="verbose_json"  # Get verbose response to access language info
-            )
+LOCAL_WHISPER_INSTALLED = local_whisper_installed()
+if TRANSCRIPTION_BACKEND in ('local', 'auto') and not LOCAL_WHISPER_INSTALLED:
+    logger.warning(f"TRANSCRIPTION_BACKEND is '{TRANSCRIPTION_BACKEND}' but openai-whisper is not installed, transcribing remotely")
+
+def get_local_whisper_model():
+    """Load the local Whisper model once per worker process"""
+    global _local_whisper_model
+    with _local_whisper_lock:
+        if _local_whisper_model is None:
+            import whisper  # openai-whisper, only needed when the local backend is used
+            logger.info(f"Loading local Whisper model '{LOCAL_WHISPER_MODEL}' on CPU")
+            _local_whisper_model = whisper.load_model(LOCAL_WHISPER_MODEL, device="cpu")
+        return _local_whisper_model
+
+def run_local_whisper(audio_path):
+    """Transcribe with the local Whisper model (blocking)"""
+    result = get_local_whisper_model().transcribe(audio_path, fp16=False)
+    return {
+        "text": result["text"].strip(),
+        "language": result.get("language"),
+        "segments": [
+            {"start": round(segment["start"], 2), "end": round(segment["end"], 2), "text": segment["text"].strip()}
+            for segment in result.get("segments", [])
+        ]
+    }
+
+def transcription_backends(duration):
+    """Backends to try in order for audio of the given length"""
+    if TRANSCRIPTION_BACKEND == 'local':
+        backends = ['local', 'remote']
+    elif TRANSCRIPTION_BACKEND == 'auto' and duration <= LOCAL_WHISPER_MAX_SECONDS:
+        backends = ['local', 'remote']
+    else:
+        backends = ['remote', 'local']
+    backends = backends if TRANSCRIPTION_FALLBACK else backends[:1]
+    if not LOCAL_WHISPER_INSTALLED:
+        # The local backend could only fail with an import error; keep it only when it is the sole backend
+        backends = [backend for backend in backends if backend != 'local'] or backends
+    return backends
+
+async def transcribe_audio(audio_path, workspace, custom_api_key=None):
+    """
+    Transcribe extracted audio with the configured backend, falling back to the other one on failure.
+    Returns a dict with text, language, duration, timestamped segments and the model used.
+    When every backend fails, the first backend's error is raised, with the fallback's error as its cause.
+    """
+    stream = await probe_audio_stream(audio_path)
+    duration = stream["duration"] if stream else 0
+    
+    errors = []
+    for backend in transcription_backends(duration):
+        try:
+            if backend == 'local':
+                result = await asyncio.get_running_loop().run_in_executor(_local_whisper_executor, run_local_whisper, audio_path)
+                result["model"] = f"whisper-{LOCAL_WHISPER_MODEL} (local)"
+            else:
+                result = await transcribe_remotely(audio_path, workspace, duration, custom_api_key)
+                result["model"] = TRANSCRIPTION_MODEL
+            result["duration"] = duration
+            return result
+        except Exception as e:
+            logger.warning(f"Transcription with the {backend} backend failed: {str(e)}")
+            errors.append(e)
+    if len(errors) > 1:
+        raise errors[0] from errors[-1]
+    raise errors[0]
+
+async def transcribe_remotely(audio_path, workspace, duration, custom_api_key=None):
+    """
+    Transcribe with the TRANSCRIPTION_MODEL API. Audio longer than a chunk is split near silences
+    into overlapping chunks that are transcribed concurrently and stitched back together.
+    """
+    # Get the appropriate OpenAI client
+    client = get_openai_client(custom_api_key)
+    if client is None:
+        raise ValueError("No OpenAI API key available. Please provide your API key in the interface.")
+    
+    if duration <= TRANSCRIPTION_CHUNK_SECONDS * 1.2:
+        transcription = await transcribe_file(client, audio_path)
+        boundaries = [0.0, max(duration, transcription.get("duration") or 0)]
+        return stitch_transcriptions(boundaries, [0.0], [transcription])
+    
+    boundaries = choose_chunk_boundaries(duration, await detect_silences(audio_path))
+    extension = os.path.splitext(audio_path)[1]
+    # Each chunk reaches TRANSCRIPTION_CHUNK_OVERLAP seconds into its neighbours
+    chunk_ranges = [
+        (max(0.0, boundaries[index] - TRANSCRIPTION_CHUNK_OVERLAP), min(duration, boundaries[index + 1] + TRANSCRIPTION_CHUNK_OVERLAP))
+        for index in range(len(boundaries) - 1)
+    ]
+    semaphore = asyncio.Semaphore(max(1, TRANSCRIPTION_CONCURRENCY))
+    
+    async def transcribe_chunk(index, start, end):
+        chunk_path = os.path.join(workspace, f"chunk_{index:03d}{extension}")
+        async with semaphore:
+            await run_media_tool([
+                FFMPEG_BINARY, "-nostdin", "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+                "-i", audio_path, "-c", "copy", chunk_path
+            ])
+            return await transcribe_file(client, chunk_path)
+    
+    logger.info(f"Transcribing {duration:.0f}s of audio in {len(chunk_ranges)} chunks")
+    transcriptions = await asyncio.gather(*(transcribe_chunk(index, start, end) for index, (start, end) in enumerate(chunk_ranges)))
+    return stitch_transcriptions(boundaries, [start for start, _ in chunk_ranges], transcriptions)
+
+async def probe_duration(media_path):
+    """Duration of a media file in seconds, 0 when ffprobe can't tell"""
+    output, _ = await run_media_tool([
+        FFPROBE_BINARY, "-v", "error", "-show_entries", "format=duration", "-of", "json", media_path
+    ])
+    return float(json.loads(output or b"{}").get("format", {}).get("duration") or 0)
+
+async def extract_keyframes(video_path, workspace):
+    """
+    Sample candidate frames on scene changes (or at a fixed interval) from the whole video into the task workspace.
+    The budget of about VIDEO_MAX_FRAMES * 5 candidates is spread over the video's duration, so long videos
+    get sparser samples rather than only their opening seconds.
+    """
+    frames_directory = os.path.join(workspace, "frames")
+    os.makedirs(frames_directory, exist_ok=True)
+    try:
+        duration = await probe_duration(video_path)
+    except RuntimeError as e:
+        logger.warning(f"Could not probe video duration, sampling at the configured rate: {str(e)}")
+        duration = 0
+    min_spacing = duration / (VIDEO_MAX_FRAMES * 5)
+    if VIDEO_FRAME_MODE == 'interval':
+        video_filter = f"fps=1/{max(VIDEO_FRAME_INTERVAL, min_spacing):.3f}"
+    else:
+        # Always keep the first frame, then frames that start a new scene at least min_spacing after the last pick
+        video_filter = (
+            f"select='isnan(prev_selected_t)+gt(scene\\,{VIDEO_SCENE_THRESHOLD})*gte(t-prev_selected_t\\,{min_spacing:.3f})'"
+        )
+    await run_media_tool([
+        FFMPEG_BINARY, "-nostdin", "-v", "error", "-i", video_path, "-an",
+        "-vf", video_filter, "-vsync", "vfr", "-q:v", "3",
+        os.path.join(frames_directory, "frame_%04d.jpg")
+    ])
+    return [os.path.join(frames_directory, name) for name in sorted(os.listdir(frames_directory))]
+
+def perceptual_hash(image_path):
+    """64-bit difference hash: near-identical frames differ in only a few bits"""
+    with Image.open(image_path) as image:
+        pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | int(pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+def select_keyframes(frame_paths):
+    """Drop near-duplicate frames, then spread the remaining picks evenly up to VIDEO_MAX_FRAMES (blocking)"""
+    selected = []
+    hashes = []
+    for frame_path in frame_paths:
+        frame_hash = perceptual_hash(frame_path)
+        if all(bin(frame_hash ^ other).count('1') > VIDEO_FRAME_HASH_DISTANCE for other in hashes):
+            selected.append(frame_path)
+            hashes.append(frame_hash)
+    if len(selected) > VIDEO_MAX_FRAMES:
+        step = (len(selected) - 1) / max(1, VIDEO_MAX_FRAMES - 1)
+        selected = [selected[round(index * step)] for index in range(VIDEO_MAX_FRAMES)]
+    return selected
+
+async def analyze_video_frames(video_path, workspace, preferred_language='auto', custom_api_key=None):
+    """
+    Fact-check what is shown on screen: sampled, deduplicated keyframes go to the vision model in one request.
+    Returns the analysis HTML, or None when frame analysis is disabled or fails.
+    """
+    if not VIDEO_FRAME_ANALYSIS:
+        return None
+    try:
+        frame_paths = await extract_keyframes(video_path, workspace)
+        keyframes = await asyncio.to_thread(select_keyframes, frame_paths)
+        if not keyframes:
+            return None
+        logger.info(f"Analyzing {len(keyframes)} of {len(frame_paths)} sampled frames")
+        image_data_urls = await asyncio.to_thread(lambda: [prepare_image(path) for path in keyframes])
+        # Claims from the frames aren't web searched separately, the transcript searches cover the video
+        image_analysis = await run_image_analysis(image_data_urls, False, preferred_language, custom_api_key)
+        analysis_html = image_analysis.get("analysis_result")
+        if is_error_html(analysis_html):
+            # The video result goes without a visual section rather than with an error report
+            logger.warning("Video frame analysis failed after all retries")
+            return None
+        return analysis_html
+    except Exception as e:
+        logger.warning(f"Video frame analysis failed: {str(e)}")
+        return None
+
+async def transcribe_video(video_path, workspace, custom_api_key=None, task_id=None):
+    """Extract the audio track and transcribe it"""
+    await set_task_stage(task_id, "extracting_audio")
+    audio_path = await extract_audio(video_path, workspace)
+    await set_task_stage(task_id, "transcribing")
+    return await transcribe_audio(audio_path, workspace, custom_api_key)
+
+async def process_video(video_path, should_use_web_search=True, task_id=None, preferred_language='auto', custom_api_key=None, cache_key=None):
+    # Intermediate files go to a workspace private to this task, so concurrent jobs never share paths
+    workspace = tempfile.mkdtemp(prefix=f"{task_id or 'video'}_", dir=SCRATCH_DIRECTORY)
+    try:
+        # Frames are sampled and analyzed while the audio is transcribed
+        transcription, visual_analysis_html = await asyncio.gather(
+            transcribe_video(video_path, workspace, custom_api_key, task_id),
+            analyze_video_frames(video_path, workspace, preferred_language, custom_api_key)
+        )
 
         # Log detected language
-        detected_language = transcription.language
+        detected_language = transcription["language"]
         logger.info(f"Detected language: {detected_language}")
 
         # Use text from transcription
-        transcription_text = transcription.text
+        transcription_text = transcription["text"]
+
+        await set_task_stage(task_id, "fact_checking")
 
-        # Perform fact-checking on the transcription
-        fact_check_html = perform_fact_check(
+        async def searching_claims(claims):
+            await set_task_stage(task_id, "searching")
+
+        fact_check_html, web_search_results = await fact_check_and_search(
             transcription_text, 
             detected_language, 
             should_use_web_search, 
             context='video',
             preferred_language=preferred_language,
-            custom_api_key=custom_api_key
+            custom_api_key=custom_api_key,
+            on_claims=searching_claims,
+            transcription_model=transcription["model"]
         )
-        
-        # Perform web search if enabled
-        web_search_results = None
-        if should_use_web_search:
-            try:
-                # Extract key factual claims from the transcription
-                claims_prompt = f"""
-                Based on this transcription, identify 5 specific factual claims that can be directly verified through web searches.
-                Focus on extracting clear, concrete statements that appear in the transcription.
-                
-                Format your response as a JSON object with a "claims" field containing an array of strings.
-                Example: {{"claims": ["The Eiffel Tower is 330 meters tall", "Barack Obama was the 44th President of the United States", etc.]}}
-                
-                Important: Formulate each claim as a direct statement (not a question) that can be fact-checked.
-                
-                Transcription:
-                {transcription_text[:2000]}  # Use first 2000 chars to keep context manageable
-                """
-                
-                # Get the appropriate OpenAI client
-                client = get_openai_client(custom_api_key)
-                
-                # If no client available, return an error
-                if client is None:
-                    return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'video', custom_api_key)
-                
-                claims_response = client.chat.completions.create(
-                    model=FACT_CHECK_MODEL,  # Use the same model as fact checking
-                    messages=[
-                        {"role": "system", "content": "You are a skilled fact-checker who can identify specific, verifiable factual claims in transcribed content. Extract only clear, concrete claims that can be verified through web searches."},
-                        {"role": "user", "content": claims_prompt}
-                    ],
-                    response_format={"type": "json_object"},
-                    max_tokens=500
-                )
-                
-                claims_text = claims_response.choices[0].message.content.strip()
-                logger.info(f"Generated claims from transcription: {claims_text}")
-                
-                # Parse the JSON response
-                import json
-                try:
-                    claims_obj = json.loads(claims_text)
-                    factual_claims = claims_obj.get("claims", [])
-                    if not factual_claims:
-                        logger.warning("No claims extracted from the response")
-                        if isinstance(claims_obj, list):
-                            factual_claims = claims_obj
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse JSON response: {e}")
-                    factual_claims = []
-                
-                # Perform web search for each claim
-                web_search_results = []
-                for claim in factual_claims[:5]:  # Limit to 5 claims
-                    search_result = perform_web_search(claim, custom_api_key)
-                    if search_result:
-                        web_search_results.append(search_result)
-                
-                logger.info(f"Completed {len(web_search_results)} web searches")
-            
-            except Exception as e:
-                logger.error(f"Error during web search extraction for video: {str(e)}")
-                web_search_results = [{"error": str(e), "search_query": "Error extracting search queries"}]
-
-        # Clean up files
-        if os.path.exists(video_path):
-            os.remove(video_path)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
 
         result_data = {
             "transcription": transcription_text,
+            "segments": transcription["segments"],
             "fact_check_html": fact_check_html,
+            "visual_analysis_html": visual_analysis_html,
             "detected_language": detected_language,
             "web_search_results": web_search_results,
             "models": {
-                "transcription": {"name": TRANSCRIPTION_MODEL},
+                "transcription": {"name": transcription["model"]},
                 "fact_check": {"name": FACT_CHECK_MODEL},
+                "image_analysis": {"name": IMAGE_ANALYSIS_MODEL} if visual_analysis_html else None,
                 "web_search": WEB_SEARCH_MODEL if should_use_web_search and web_search_results else "Not used",
                 "web_search_enabled": should_use_web_search
             },
             "status": "completed",
+            "stage": "done",
             "timestamp": datetime.now().isoformat()
         }
+        await store_cached_result(cache_key, result_data)
+        result_data["cache"] = cache_status(cache_key)
         
         # If we have a task_id, store the results
         if task_id:
-            task_results[task_id] = result_data
-            logger.info(f"Stored results for task {task_id}")
+            await save_task(task_id, result_data)
             
         return JSONResponse(content=result_data)
     except Exception as e:
         error_msg = f"Error processing video: {str(e)}"
         logging.error(error_msg)
         
-        # Clean up files in case of error
-        for path in [video_path, audio_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Error cleaning up file {path}: {str(cleanup_error)}")
-        
         # If we have a task_id, store the error
         if task_id:
-            task_results[task_id] = {
+            await save_task(task_id, {
                 "status": "error",
+                "stage": "error",
                 "error": error_msg,
                 "timestamp": datetime.now().isoformat()
-            }
-            logger.info(f"Stored error for task {task_id}")
+            })
                     
         raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        # Clean up the upload and the whole task workspace whether or not processing succeeded
+        try:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+        except Exception as cleanup_error:
+            logger.warning(f"Error cleaning up file {video_path}: {str(cleanup_error)}")
+        shutil.rmtree(workspace, ignore_errors=True)
+
+class SharedHTTPClient:
+    """
+    One httpx.AsyncClient per worker for a kind of outbound request, created on first use with client_options.
+    The client never keeps cookies, so no response can leave cookies behind for another request.
+    """
+    
+    def __init__(self, **client_options):
+        self.client_options = client_options
+        self.client = None
+        self.loop = None
+    
+    def get(self):
+        """The shared client; must be called from the event loop it will be used on"""
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            self.client = httpx.AsyncClient(
+                cookies=http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])),
+                **self.client_options
+            )
+            self.loop = loop
+        return self.client
+    
+    async def close(self):
+        if self.client is not None and self.loop is asyncio.get_running_loop():
+            await self.client.aclose()
+        self.client = None
+        self.loop = None
+
+webhook_http_client = SharedHTTPClient(timeout=httpx.Timeout(WEBHOOK_TIMEOUT), follow_redirects=False)
+
+@app.on_event("shutdown")
+async def close_webhook_http_client():
+    await webhook_http_client.close()
+
+async def run_video_job_on_loop(job_args):
+    try:
+        await process_video(*job_args)
+    finally:
+        # The job's event loop ends here, close its connection pool instead of leaking one per job
+        await openai_client_pool.close()
+
+def run_video_job(job_args):
+    """Entry point of a video worker process: run one process_video job on a private event loop. Returns whether it succeeded."""
+    try:
+        asyncio.run(run_video_job_on_loop(job_args))
+        return True
+    except Exception as e:
+        # process_video has already stored the error status for the task
+        logger.error(f"Video job failed: {str(e)}")
+        return False
+
+async def validate_callback_url(callback_url):
+    """
+    Check a webhook URL and return the address to deliver to, raising HTTPException(400) for URLs that aren't allowed.
+    Hosts in WEBHOOK_ALLOWED_HOSTS are trusted as they are (None is returned). Without an allow-list, the host must
+    resolve only to public addresses, so uploads can't make the server call loopback, private or link-local
+    services such as cloud metadata endpoints.
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise HTTPException(status_code=400, detail="callback_url must be an http or https URL")
+    hostname = parsed.hostname.lower()
+    if WEBHOOK_ALLOWED_HOSTS:
+        if hostname not in WEBHOOK_ALLOWED_HOSTS:
+            raise HTTPException(status_code=400, detail=f"callback_url host {parsed.hostname} is not allowed")
+        return None
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        address_infos = await asyncio.get_running_loop().getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"callback_url host {parsed.hostname} could not be resolved")
+    # Drop IPv6 scope ids such as fe80::1%eth0
+    addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in address_infos]
+    if not addresses or not all(address.is_global for address in addresses):
+        raise HTTPException(status_code=400, detail=f"callback_url host {parsed.hostname} is not a public address")
+    return str(addresses[0])
+
+def pinned_webhook_request(callback_url, address):
+    """
+    URL, headers and httpx extensions that send a webhook to the address it was validated against instead of
+    resolving the host again, which a DNS rebinding attack could point elsewhere. Host and TLS SNI keep the hostname.
+    """
+    parsed = urlparse(callback_url)
+    if address is None:
+        return callback_url, {}, {}
+    host = f"[{address}]" if ':' in address else address
+    netloc = f"{host}:{parsed.port}" if parsed.port else host
+    if parsed.username is not None:
+        netloc = f"{parsed.netloc.rsplit('@', 1)[0]}@{netloc}"
+    host_header = f"{parsed.hostname}:{parsed.port}" if parsed.port else parsed.hostname
+    return parsed._replace(netloc=netloc).geturl(), {"Host": host_header}, {"sni_hostname": parsed.hostname}
+
+async def deliver_task_webhook(task_id, callback_url):
+    """POST the final status of a task to its callback URL, retrying with backoff"""
+    task_data = await asyncio.to_thread(task_store.get, task_id)
+    if task_data is None:
+        logger.warning(f"No status to deliver for task {task_id}")
+        return False
+    body = json.dumps({"task_id": task_id, **task_data}).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if WEBHOOK_SECRET:
+        # Receivers verify the payload with HMAC-SHA256 of the raw body
+        headers["X-Webhook-Signature"] = "sha256=" + hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    for attempt in range(WEBHOOK_MAX_RETRIES):
+        try:
+            # Checked again at delivery, the host may resolve differently than when the task was submitted
+            address = await validate_callback_url(callback_url)
+        except HTTPException as e:
+            logger.error(f"Not delivering webhook for task {task_id}: {e.detail}")
+            return False
+        request_url, request_headers, extensions = pinned_webhook_request(callback_url, address)
+        try:
+            response = await webhook_http_client.get().post(
+                request_url, content=body, headers={**headers, **request_headers}, extensions=extensions
+            )
+            if response.status_code < 300:
+                logger.info(f"Delivered webhook for task {task_id}")
+                return True
+            logger.warning(f"Webhook for task {task_id} got HTTP {response.status_code} (attempt {attempt+1}/{WEBHOOK_MAX_RETRIES})")
+        except httpx.HTTPError as e:
+            logger.warning(f"Webhook for task {task_id} failed (attempt {attempt+1}/{WEBHOOK_MAX_RETRIES}): {str(e)}")
+        if attempt < WEBHOOK_MAX_RETRIES - 1:
+            await asyncio.sleep(2 ** attempt)
+    logger.error(f"Giving up on webhook for task {task_id}")
+    return False
+
+# Upload priorities, lower runs first
+VIDEO_JOB_PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+class VideoJobQueue:
+    """
+    Bounded priority queue of video jobs drained by VIDEO_WORKERS workers.
+    Jobs run in a process pool so decoding and transcription never compete with request handling.
+    """
+    
+    def __init__(self, max_size, workers, use_processes):
+        self.max_size = max_size
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+        # Heap of (priority, sequence, task_id, job_args, callback_url); the sequence keeps equal priorities FIFO
+        self.pending = []
+        self.sequence = itertools.count()
+        self.running = set()
+        self.available = None
+        self.executor = None
+        self.worker_tasks = []
+        self.webhook_tasks = set()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.average_duration = 60.0  # Seconds, moving average used for Retry-After
+    
+    def start(self):
+        self.available = asyncio.Semaphore(0)
+        if self.use_processes:
+            self.executor = self._create_executor()
+        self.worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} video workers ({'processes' if self.use_processes else 'in-process'}), queue size {self.max_size}")
+    
+    def _create_executor(self):
+        # Spawned processes start clean instead of inheriting the server's event loop and threads
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    def _replace_broken_executor(self, executor):
+        """Swap in a new process pool after a worker process died; every worker whose job was lost calls this, one rebuilds"""
+        if self.executor is executor:
+            logger.error("A video worker process died, restarting the worker pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._create_executor()
+    
+    async def _fail_lost_job(self, task_id, video_path):
+        """Record the error for a job whose worker process died, which left no status behind, and remove its upload"""
+        await save_task(task_id, {
+            "status": "error",
+            "stage": "error",
+            "error": "Error processing video: the video worker stopped unexpectedly",
+            "timestamp": datetime.now().isoformat()
+        })
+        try:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+        except Exception as cleanup_error:
+            logger.warning(f"Error cleaning up file {video_path}: {str(cleanup_error)}")
+    
+    async def stop(self):
+        for worker_task in self.worker_tasks:
+            worker_task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def is_full(self):
+        return len(self.pending) >= self.max_size
+    
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up"""
+        return max(1, math.ceil(self.average_duration * (len(self.pending) - self.max_size + 1) / self.workers))
+    
+    def submit(self, task_id, job_args, priority='normal', callback_url=None):
+        """Queue a job, whose final status is POSTed to callback_url if given. Returns False when the queue is full."""
+        if self.is_full():
+            self.rejected += 1
+            return False
+        heapq.heappush(self.pending, (VIDEO_JOB_PRIORITIES.get(priority, 1), next(self.sequence), task_id, job_args, callback_url))
+        self.available.release()
+        return True
+    
+    def position(self, task_id):
+        """1-based position of a queued job, or None if it isn't waiting in this worker's queue"""
+        for index, item in enumerate(sorted(self.pending)):
+            if item[2] == task_id:
+                return index + 1
+        return None
+    
+    async def _worker(self):
+        while True:
+            await self.available.acquire()
+            _, _, task_id, job_args, callback_url = heapq.heappop(self.pending)
+            self.running.add(task_id)
+            started = time.time()
+            executor = self.executor
+            succeeded = False
+            try:
+                await set_task_stage(task_id, "starting")
+                if executor is not None:
+                    succeeded = await asyncio.get_running_loop().run_in_executor(executor, run_video_job, job_args)
+                else:
+                    await process_video(*job_args)
+                    succeeded = True
+            except asyncio.CancelledError:
+                raise
+            except BrokenProcessPool:
+                logger.error(f"Video job {task_id} was lost with its worker process")
+                self._replace_broken_executor(executor)
+                await self._fail_lost_job(task_id, job_args[0])
+            except Exception as e:
+                logger.error(f"Video job {task_id} failed: {str(e)}")
+            finally:
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.running.discard(task_id)
+                self.average_duration = 0.8 * self.average_duration + 0.2 * (time.time() - started)
+                if callback_url:
+                    # Delivered in the background so webhook retries don't hold up the next job
+                    webhook_task = asyncio.create_task(deliver_task_webhook(task_id, callback_url))
+                    self.webhook_tasks.add(webhook_task)
+                    webhook_task.add_done_callback(self.webhook_tasks.discard)
+    
+    def stats(self):
+        return {
+            "queued": len(self.pending),
+            "running": len(self.running),
+            "max_queue_size": self.max_size,
+            "workers": self.workers,
+            "worker_processes": self.use_processes,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "average_job_seconds": round(self.average_duration, 1)
+        }
+
+# Worker processes only see tasks through a shared store, so the in-memory store keeps jobs in-process
+if VIDEO_WORKER_PROCESSES and TASK_STORE_BACKEND == 'memory':
+    logger.warning("TASK_STORE_BACKEND=memory cannot share task status with worker processes, running video jobs in-process")
+video_queue = VideoJobQueue(VIDEO_QUEUE_MAX_SIZE, VIDEO_WORKERS, VIDEO_WORKER_PROCESSES and TASK_STORE_BACKEND != 'memory')
+
+@app.on_event("startup")
+async def start_video_queue():
+    video_queue.start()
+
+@app.on_event("shutdown")
+async def stop_video_queue():
+    await video_queue.stop()
+
+def raise_queue_full():
+    """Reject a video submission while the job queue is at capacity"""
+    retry_after = video_queue.retry_after()
+    logger.warning(f"Video queue full ({len(video_queue.pending)} jobs), rejecting upload")
+    raise HTTPException(
+        status_code=429,
+        detail=f"Too many videos are being processed. Please try again in {retry_after} seconds.",
+        headers={"Retry-After": str(retry_after)}
+    )
 
 # Schedule periodic task cleanup to run every hour
 @app.on_event("startup")
 async def setup_periodic_cleanup():
-    import asyncio
+    async def run_periodic_cleanup():
+        while True:
+            cleanup_old_files()
+            await asyncio.to_thread(cleanup_old_tasks)
+            if result_cache is not None:
+                try:
+                    purged = await asyncio.to_thread(result_cache.purge_expired)
+                    logger.debug(f"Purged {purged} expired cached results")
+                except Exception as e:
+                    logger.warning(f"Error purging result cache: {str(e)}")
+            try:
+                purged = await asyncio.to_thread(web_search_cache.purge_expired)
+                logger.debug(f"Purged {purged} expired web search results")
+            except Exception as e:
+                logger.warning(f"Error purging web search cache: {str(e)}")
+            if instagram_media_cache is not None:
+                try:
+                    purged = await asyncio.to_thread(instagram_media_cache.purge_expired)
+                    logger.debug(f"Purged {purged} expired Instagram downloads")
+                except Exception as e:
+                    logger.warning(f"Error purging Instagram media cache: {str(e)}")
+            await asyncio.sleep(3600)  # Run once per hour
+    
+    # Start the background task
+    asyncio.create_task(run_periodic_cleanup())
+
+# Direct Instagram requests share connections and TLS sessions across embed pages, API lookups and media downloads
+instagram_http_client = SharedHTTPClient(
+    limits=httpx.Limits(max_connections=INSTAGRAM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=INSTAGRAM_HTTP_MAX_CONNECTIONS),
+    timeout=httpx.Timeout(INSTAGRAM_HTTP_TIMEOUT, connect=10.0),
+    follow_redirects=True
+)
+
+@app.on_event("shutdown")
+async def close_instagram_http_client():
+    await instagram_http_client.close()
+
+class InstagramSessionPool:
+    """
+    Warm Instaloader instances sharing one Instagram login, each lent to one download at a time.
+    The saved session (or a fresh login) is loaded and health-checked once in the background, then re-checked
+    every refresh_seconds or when a download hits an auth error, so requests never read session files or log in.
+    Its cookies also serve the direct download path.
+    """
+    
+    def __init__(self, size, session_file, refresh_seconds):
+        self.size = max(1, size)
+        self.session_file = session_file
+        self.refresh_seconds = refresh_seconds
+        # Pickled cookie dict every loader is built from; None while anonymous
+        self.session_data = None
+        self.username = None
+        self.generation = 0
+        self.idle = None
+        self.ready = None
+        self.refresh_requested = None
+        self.refresh_task = None
+    
+    def start(self):
+        """Create the pool on the running event loop and establish the session in the background"""
+        if self.ready is not None:
+            return
+        self.idle = asyncio.Queue()
+        self.ready = asyncio.Event()
+        self.refresh_requested = asyncio.Event()
+        self.refresh_task = asyncio.create_task(self._maintain())
+    
+    async def stop(self):
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+    
+    def _create_loader(self):
+        L = instaloader.Instaloader(
+            filename_pattern="media",
+            download_videos=True,
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            save_metadata=False,
+            compress_json=False
+        )
+        if self.session_data:
+            L.context.load_session_from_file(self.username, io.BytesIO(self.session_data))
+        return L
+    
+    def _establish(self, rejected_cookies=None):
+        """
+        Use the saved session, or log in, keeping a session only if Instagram accepts it (blocking).
+        rejected_cookies is a session Instagram just refused, which isn't tested again if the file still holds it.
+        Rate limits and network errors propagate, so the caller keeps what it has and tries again later.
+        """
+        if os.path.exists(self.session_file):
+            # Another worker may have saved a newer session since this one loaded it
+            try:
+                with open(self.session_file, 'rb') as f:
+                    saved_cookies = pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading Instagram session: {str(e)}")
+                saved_cookies = None
+            if saved_cookies and saved_cookies != rejected_cookies:
+                L = instaloader.Instaloader()
+                L.load_session_from_file(INSTAGRAM_USERNAME, self.session_file)
+                username = L.test_login()
+                if username:
+                    logger.info("Instagram session loaded successfully")
+                    return self._adopt(L, username)
+                logger.warning("Saved Instagram session is no longer valid")
+        
+        if INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD:
+            logger.info(f"Logging in to Instagram as {INSTAGRAM_USERNAME}")
+            L = instaloader.Instaloader()
+            L.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
+            logger.info("Instagram login successful")
+            try:
+                L.save_session_to_file(self.session_file)
+                logger.info("Saved Instagram session for future use")
+            except Exception as e:
+                logger.error(f"Error saving Instagram session: {str(e)}")
+            # Add substantial delay after login to reduce suspicion
+            time.sleep(3 if os.path.exists('/.dockerenv') else 1.5)
+            return self._adopt(L, INSTAGRAM_USERNAME)
+        
+        # Keep downloading anonymously until a later check finds a session
+        if self.session_data is not None or self.generation == 0:
+            logger.warning("No working Instagram session, downloads will be anonymous")
+        return self._adopt(None, None)
+    
+    def _adopt(self, L, username):
+        if L is None:
+            session_data = None
+        else:
+            buffer = io.BytesIO()
+            L.context.save_session_to_file(buffer)
+            session_data = buffer.getvalue()
+        # Loaders are only rebuilt when the session actually changed
+        if session_data != self.session_data or self.generation == 0:
+            self.session_data = session_data
+            self.username = username
+            self.generation += 1
+        return self.generation
+    
+    def _check(self):
+        """
+        Whether the current session still works (blocking); anonymous pools always look for a session again.
+        Raises when Instagram can't tell, e.g. on rate limits or network errors.
+        """
+        if not self.session_data:
+            return False
+        return self._create_loader().test_login() is not None
+    
+    async def _maintain(self):
+        failures = 0
+        try:
+            await asyncio.to_thread(self._establish)
+        except Exception as e:
+            failures = 1
+            logger.error(f"Error setting up Instagram sessions, downloading anonymously for now: {str(e)}")
+            self._adopt(None, None)
+        for _ in range(self.size):
+            self.idle.put_nowait((self.generation, self._create_loader()))
+        self.ready.set()
+        last_check = time.monotonic()
+        while True:
+            if failures:
+                # Rate limited or unreachable: keep the current session and back off, ignoring requests to check sooner
+                await asyncio.sleep(min(self.refresh_seconds, 60 * 2 ** (failures - 1)))
+            else:
+                try:
+                    await asyncio.wait_for(self.refresh_requested.wait(), self.refresh_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                # Failed downloads ask in bursts, and Instagram also answers rate limits with 401, so check sparingly
+                await asyncio.sleep(max(0, last_check + INSTAGRAM_SESSION_MIN_CHECK_INTERVAL - time.monotonic()))
+            self.refresh_requested.clear()
+            last_check = time.monotonic()
+            try:
+                # Only a definite "not logged in" from Instagram replaces the session
+                if not await asyncio.to_thread(self._check):
+                    await asyncio.to_thread(self._establish, self.cookies() or None)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Could not check the Instagram session, keeping the current one: {str(e)}")
+    
+    def request_refresh(self):
+        """Ask for the session to be re-checked now, e.g. after Instagram rejected a download"""
+        if self.refresh_requested is not None:
+            self.refresh_requested.set()
+    
+    @asynccontextmanager
+    async def loader(self):
+        """Borrow a logged-in (or anonymous) Instaloader for one download"""
+        self.start()
+        await self.ready.wait()
+        generation, L = await self.idle.get()
+        try:
+            # Loaders built before a refresh are rebuilt from the new session
+            if generation != self.generation:
+                generation, L = self.generation, self._create_loader()
+            yield L
+        finally:
+            self.idle.put_nowait((generation, L))
+    
+    def cookies(self):
+        """Session cookies for direct requests to Instagram, empty while anonymous"""
+        return pickle.loads(self.session_data) if self.session_data else {}
+
+instagram_sessions = InstagramSessionPool(INSTAGRAM_SESSION_POOL_SIZE, INSTAGRAM_SESSION_FILE, INSTAGRAM_SESSION_CHECK_INTERVAL)
+
+@app.on_event("startup")
+async def start_instagram_sessions():
+    instagram_sessions.start()
+
+@app.on_event("shutdown")
+async def stop_instagram_sessions():
+    await instagram_sessions.stop()
+
+INSTAGRAM_SHORTCODE_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+def extract_instagram_shortcode(url):
+    """Shortcode of the post, reel or IGTV video an Instagram URL points to"""
+    shortcode = None
+    if '/p/' in url:
+        shortcode = url.split('/p/')[1].split('/')[0].split('?')[0]
+    elif '/reel/' in url:
+        shortcode = url.split('/reel/')[1].split('/')[0].split('?')[0]
+    elif '/tv/' in url:
+        shortcode = url.split('/tv/')[1].split('/')[0].split('?')[0]
+    else:
+        # Try to extract from end of URL
+        path_parts = url.rstrip('/').split('/')
+        if len(path_parts) > 0:
+            potential_code = path_parts[-1].split('?')[0]
+            if potential_code and not potential_code.startswith('http'):
+                shortcode = potential_code
+    
+    # Shortcodes name files on disk, so anything else is rejected rather than used in a path
+    if not shortcode or not INSTAGRAM_SHORTCODE_PATTERN.match(shortcode):
+        logger.error("Could not extract shortcode from Instagram URL")
+        raise ValueError("Invalid Instagram URL format")
+    
+    return shortcode
+
+def instagram_upload_path(shortcode, extension):
+    """Unique upload directory path for one request's copy of a post's media"""
+    return os.path.join(UPLOAD_DIRECTORY, f"instagram_{shortcode}_{uuid.uuid4().hex}{extension}")
+
+def link_or_copy(source, destination):
+    """Hard link source to destination, copying when they are on different filesystems"""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+class InstagramMediaCache:
+    """
+    Downloaded Instagram media on disk keyed by shortcode, indexed in SQLite so every worker shares it.
+    Entries expire after a TTL and least recently used files are evicted to keep the directory under its quota.
+    """
+    
+    def __init__(self, directory, ttl_seconds, max_bytes):
+        self.directory = directory
+        self.db_path = os.path.join(directory, "media.db")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._run(self._create_schema)
+    
+    def _run(self, operation):
+        return run_sqlite(self.db_path, operation)
+    
+    def _create_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                shortcode TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_last_access ON media (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_created_at ON media (created_at)")
+    
+    def _remove_files(self, filenames):
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+    
+    def checkout(self, shortcode):
+        """
+        Copy of the cached media for shortcode in the upload directory, which the caller owns and may delete,
+        or None on a miss (blocking).
+        """
+        def operation(conn):
+            row = conn.execute("SELECT filename, created_at FROM media WHERE shortcode = ?", (shortcode,)).fetchone()
+            if row is None:
+                return None
+            filename, created_at = row
+            now = time.time()
+            if now - created_at <= self.ttl_seconds:
+                destination = instagram_upload_path(shortcode, os.path.splitext(filename)[1])
+                try:
+                    link_or_copy(os.path.join(self.directory, filename), destination)
+                    # A hard link keeps the download's mtime, which cleanup_old_files would take for the checkout's age
+                    os.utime(destination)
+                    conn.execute("UPDATE media SET last_access = ? WHERE shortcode = ?", (now, shortcode))
+                    return destination
+                except FileNotFoundError:
+                    # Evicted by another worker between the lookup and the copy
+                    pass
+            conn.execute("DELETE FROM media WHERE shortcode = ?", (shortcode,))
+            self._remove_files([filename])
+            return None
+        media_path = self._run(operation)
+        if media_path:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return media_path
+    
+    def store(self, shortcode, media_path):
+        """Add a finished download to the cache, leaving the original in place (blocking)"""
+        filename = f"{shortcode}{os.path.splitext(media_path)[1].lower()}"
+        size = os.path.getsize(media_path)
+        if size > self.max_bytes:
+            logger.info(f"Instagram media for {shortcode} is larger than the cache quota, not caching it")
+            return
+        # Written under a temporary name first, so a reader never sees a partial file
+        temporary_path = os.path.join(self.directory, f".{filename}.{uuid.uuid4().hex}")
+        link_or_copy(media_path, temporary_path)
+        os.replace(temporary_path, os.path.join(self.directory, filename))
+        def operation(conn):
+            now = time.time()
+            stale = [row[0] for row in conn.execute("SELECT filename FROM media WHERE shortcode = ?", (shortcode,)) if row[0] != filename]
+            conn.execute(
+                "INSERT OR REPLACE INTO media (shortcode, filename, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (shortcode, filename, size, now, now)
+            )
+            # Evict least recently used media until the directory fits its quota
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM media").fetchone()[0]
+            if total_size > self.max_bytes:
+                evicted = []
+                for old_shortcode, old_filename, old_size in conn.execute("SELECT shortcode, filename, size FROM media ORDER BY last_access").fetchall():
+                    if total_size <= self.max_bytes:
+                        break
+                    evicted.append((old_shortcode, old_filename))
+                    total_size -= old_size
+                conn.executemany("DELETE FROM media WHERE shortcode = ?", [(old_shortcode,) for old_shortcode, _ in evicted])
+                stale.extend(old_filename for _, old_filename in evicted)
+                logger.info(f"Evicted {len(evicted)} cached Instagram downloads to stay under {self.max_bytes} bytes")
+            return stale
+        self._remove_files(self._run(operation))
+        logger.info(f"Cached Instagram media for {shortcode} ({size} bytes)")
     
-    async def run_periodic_cleanup():
-        while True:
-            cleanup_old_files()
-            cleanup_old_tasks()
-            await asyncio.sleep(3600)  # Run once per hour
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        def operation(conn):
+            expired = [row[0] for row in conn.execute("SELECT filename FROM media WHERE created_at < ?", (cutoff,))]
+            conn.execute("DELETE FROM media WHERE created_at < ?", (cutoff,))
+            return expired
+        expired = self._run(operation)
+        self._remove_files(expired)
+        return len(expired)
     
-    # Start the background task
-    asyncio.create_task(run_periodic_cleanup())
+    def stats(self):
+        """Entry count and disk usage across all workers, hit counts for this one (blocking)"""
+        entries, total_size = self._run(lambda conn: conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media").fetchone())
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total_size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "downloads_in_flight": len(instagram_downloads)
+        }
+
+instagram_media_cache = InstagramMediaCache(os.path.join(CACHE_DIRECTORY, "instagram"), INSTAGRAM_CACHE_TTL, INSTAGRAM_CACHE_MAX_MB * 1024 * 1024) if INSTAGRAM_CACHE_ENABLED else None
+
+# Instagram downloads running in this worker, keyed by shortcode: [download task, number of requests waiting on it]
+instagram_downloads = {}
+
+async def fetch_instagram_media(url):
+    """
+    Instagram media for url as a file in the upload directory that belongs to the caller.
+    Recently downloaded posts come from instagram_media_cache; concurrent requests for the same shortcode
+    share one download and each get their own copy of the result.
+    """
+    shortcode = extract_instagram_shortcode(url)
+    if instagram_media_cache is not None:
+        try:
+            cached_path = await asyncio.to_thread(instagram_media_cache.checkout, shortcode)
+            if cached_path:
+                logger.info(f"Instagram media for {shortcode} served from cache: {cached_path}")
+                return cached_path
+        except Exception as e:
+            logger.warning(f"Error reading Instagram media cache for {shortcode}: {str(e)}")
+    
+    flight = instagram_downloads.get(shortcode)
+    if flight is None:
+        flight = [asyncio.ensure_future(download_and_cache_instagram_media(url, shortcode)), 0]
+        instagram_downloads[shortcode] = flight
+    else:
+        logger.info(f"Waiting for the Instagram download of {shortcode} already in progress")
+    flight[1] += 1
+    try:
+        # Shielded so a request that goes away doesn't cancel the download for the others
+        media_path = await asyncio.shield(flight[0])
+        destination = instagram_upload_path(shortcode, os.path.splitext(media_path)[1].lower())
+        await asyncio.to_thread(link_or_copy, media_path, destination)
+        return destination
+    finally:
+        flight[1] -= 1
+        if flight[1] == 0:
+            if instagram_downloads.get(shortcode) is flight:
+                del instagram_downloads[shortcode]
+            # Every request has its own copy (or gave up), the shared download can go once it finishes
+            flight[0].add_done_callback(discard_instagram_download)
+
+async def download_and_cache_instagram_media(url, shortcode):
+    media_path = await download_instagram_video(url)
+    if instagram_media_cache is not None:
+        try:
+            await asyncio.to_thread(instagram_media_cache.store, shortcode, media_path)
+        except Exception as e:
+            logger.warning(f"Error caching Instagram media for {shortcode}: {str(e)}")
+    return media_path
+
+def discard_instagram_download(download):
+    if download.cancelled() or download.exception() is not None:
+        return
+    try:
+        os.remove(download.result())
+    except FileNotFoundError:
+        pass
 
-def download_instagram_video(url: str) -> str:
+async def download_instagram_video(url: str) -> str:
     """Download video from Instagram with better error handling and fallback mechanism"""
     is_docker = os.path.exists('/.dockerenv')  # Check if running in Docker
     
     if is_docker:
         logger.info("Running in Docker environment - using adapted Instagram download approach")
     
-    # Try to extract shortcode from URL first
-    shortcode = None
-    if '/p/' in url:
-        shortcode = url.split('/p/')[1].split('/')[0].split('?')[0]
-    elif '/reel/' in url:
-        shortcode = url.split('/reel/')[1].split('/')[0].split('?')[0]
-    elif '/tv/' in url:
-        shortcode = url.split('/tv/')[1].split('/')[0].split('?')[0]
-    else:
-        # Try to extract from end of URL
-        path_parts = url.rstrip('/').split('/')
-        if len(path_parts) > 0:
-            potential_code = path_parts[-1].split('?')[0]
-            if potential_code and not potential_code.startswith('http'):
-                shortcode = potential_code
-    
-    if not shortcode:
-        logger.error("Could not extract shortcode from Instagram URL")
-        raise ValueError("Invalid Instagram URL format")
-            
+    shortcode = extract_instagram_shortcode(url)
     logger.info(f"Extracted Instagram shortcode: {shortcode}")
     
+    # Every download writes into its own directory, so the file it returns can't belong to another request
+    download_directory = tempfile.mkdtemp(prefix=f"instagram_{shortcode}_", dir=SCRATCH_DIRECTORY)
+    try:
+        return keep_download(await download_instagram_media(url, shortcode, download_directory), shortcode)
+    finally:
+        await asyncio.to_thread(shutil.rmtree, download_directory, True)
+
+def keep_download(media_path, shortcode):
+    """Move a finished download out of its private directory into the upload directory under a unique name"""
+    destination = instagram_upload_path(shortcode, os.path.splitext(media_path)[1].lower())
+    os.replace(media_path, destination)
+    logger.info(f"Instagram media saved to {destination}")
+    return destination
+
+def instaloader_media_path(post, download_directory):
+    """
+    Path instaloader writes the post's media to with filename_pattern "media": the video if there is one,
+    for carousels the first video item (media_<n>), otherwise the image.
+    """
+    if post.typename == 'GraphSidecar':
+        nodes = list(post.get_sidecar_nodes())
+        for index, node in enumerate(nodes, start=1):
+            if node.is_video:
+                return os.path.join(download_directory, f"media_{index}.mp4")
+        return os.path.join(download_directory, "media_1.jpg") if nodes else None
+    return os.path.join(download_directory, "media.mp4" if post.is_video else "media.jpg")
+
+async def download_instagram_media(url, shortcode, download_directory):
+    """Try yt-dlp, then instaloader with retries, returning the path of the downloaded file in download_directory"""
     # First try direct method with yt-dlp if enabled and installed
-    if USE_YTDLP and attempt_yt_dlp_download(url, shortcode):
-        # Find downloaded media files
-        media_files = find_media_files()
-        
-        if media_files:
-            latest_media_file = max(media_files, key=os.path.getctime)
-            logger.info(f"Found media file: {latest_media_file}")
-            return latest_media_file
+    if USE_YTDLP:
+        media_path = await attempt_yt_dlp_download(url, shortcode, download_directory)
+        if media_path:
+            logger.info(f"Found media file: {media_path}")
+            return media_path
     
     # If yt-dlp fails or is disabled, fall back to instaloader with retries
     for attempt in range(INSTAGRAM_MAX_RETRIES):
         try:
-            cleanup_old_files()
             logger.info(f"Instagram download attempt {attempt+1}/{INSTAGRAM_MAX_RETRIES} for URL: {url}")
             
             # Add jitter to delay to appear more like human behavior
             delay = INSTAGRAM_RETRY_DELAY + random.uniform(0.5, 2.0)
             logger.info(f"Waiting {delay:.2f} seconds before Instagram request")
-            time.sleep(delay)
-            
-            # Setup instaloader with specific settings for Docker environment
-            L = instaloader.Instaloader(
-                dirname_pattern=UPLOAD_DIRECTORY,
-                download_videos=True,
-                download_video_thumbnails=False,
-                download_geotags=False,
-                download_comments=False,
-                save_metadata=False,
-                compress_json=False
-            )
-            
-            # Track files before download to compare after
-            files_before = set(os.listdir(UPLOAD_DIRECTORY))
-            
-            # Try loading session from file first if it exists
-            try:
-                session_file = os.path.join(os.path.dirname(__file__), "instagram_session")
-                if os.path.exists(session_file):
-                    logger.info("Found Instagram session file, attempting to load")
-                    L.load_session_from_file(INSTAGRAM_USERNAME, session_file)
-                    logger.info("Instagram session loaded successfully")
-                    login_successful = True
-                else:
-                    login_successful = False
-            except Exception as e:
-                logger.error(f"Error loading Instagram session: {str(e)}")
-                login_successful = False
-            
-            # Attempt login if session load failed
-            if not login_successful and INSTAGRAM_USERNAME and INSTAGRAM_PASSWORD:
-                try:
-                    logger.info(f"Logging in to Instagram as {INSTAGRAM_USERNAME}")
-                    L.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-                    logger.info("Instagram login successful")
-                    # Save the session for future use
-                    try:
-                        L.save_session_to_file(session_file)
-                        logger.info("Saved Instagram session for future use")
-                    except Exception as e:
-                        logger.error(f"Error saving Instagram session: {str(e)}")
-                    login_successful = True
-                    # Add substantial delay after login to reduce suspicion
-                    time.sleep(3 if is_docker else 1.5)
-                except Exception as login_error:
-                    logger.error(f"Instagram login failed: {str(login_error)}")
-                    logger.error(traceback.format_exc())
-                    # Don't abort on login failure, try anonymous download or alternative method
+            await asyncio.sleep(delay)
             
-            # Try to download post with instaloader
             try:
-                logger.info(f"Downloading Instagram post with shortcode: {shortcode}")
-                post = instaloader.Post.from_shortcode(L.context, shortcode)
-                L.download_post(post, target=UPLOAD_DIRECTORY)
-                logger.info("Instagram download successful")
+                async with instagram_sessions.loader() as loader:
+                    # Instaloader is synchronous, the download runs in a thread
+                    media_path = await asyncio.to_thread(instaloader_download, loader, shortcode, download_directory)
             except Exception as e:
                 logger.error(f"Error downloading via Instaloader: {str(e)}")
                 logger.error(traceback.format_exc())
                 
                 # More specific error details for debugging
+                if "401" in str(e) or "Login required" in str(e):
+                    # The shared session may have expired, have it checked in the background
+                    instagram_sessions.request_refresh()
                 if "401" in str(e):
                     logger.error("Instagram 401 error: Authentication required or rate limited")
                 elif "429" in str(e):
@@ -1050,42 +3348,15 @@ def download_instagram_video(url: str) -> str:
                     logger.error("Instagram page structure changed - parser needs updating")
                 
                 # Try alternative download method if instaloader fails and direct download is enabled
-                if USE_DIRECT_DOWNLOAD and attempt_alternative_download(url, shortcode):
+                media_path = await attempt_alternative_download(url, shortcode, download_directory) if USE_DIRECT_DOWNLOAD else None
+                if media_path:
                     logger.info("Alternative download method succeeded")
                 else:
                     raise e
             
-            # Find newly added files by comparing directories before and after
-            files_after = set(os.listdir(UPLOAD_DIRECTORY))
-            new_files = files_after - files_before
-            logger.info(f"New files after download: {new_files}")
-            
-            # First check specifically for video files
-            video_files = [os.path.join(UPLOAD_DIRECTORY, f) for f in new_files 
-                          if f.lower().endswith(('.mp4', '.mov', '.avi'))]
-            
-            if video_files:
-                latest_video_file = max(video_files, key=lambda f: os.path.getctime(os.path.join(UPLOAD_DIRECTORY, os.path.basename(f))))
-                logger.info(f"Found video file: {latest_video_file}")
-                return latest_video_file
-            
-            # If no video files found but other files were added, check for images
-            image_files = [os.path.join(UPLOAD_DIRECTORY, f) for f in new_files 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))]
-            
-            if image_files:
-                latest_image_file = max(image_files, key=lambda f: os.path.getctime(os.path.join(UPLOAD_DIRECTORY, os.path.basename(f))))
-                logger.info(f"Found image file: {latest_image_file}")
-                return latest_image_file
-                
-            # If we've downloaded something but didn't catch it with the above logic, 
-            # Try a broader media file search
-            media_files = find_media_files()
-            
-            if media_files:
-                latest_media_file = max(media_files, key=os.path.getctime)
-                logger.info(f"Found media file through backup search: {latest_media_file}")
-                return latest_media_file
+            if media_path and os.path.exists(media_path):
+                logger.info(f"Found media file: {media_path}")
+                return media_path
             
             logger.warning("No media files found after download")
             raise FileNotFoundError("No media files downloaded")
@@ -1101,7 +3372,7 @@ def download_instagram_video(url: str) -> str:
             # Otherwise wait before retrying with increasing delay
             retry_delay = INSTAGRAM_RETRY_DELAY * (attempt + 1) + random.uniform(1, 3)
             logger.info(f"Waiting {retry_delay:.2f} seconds before retry #{attempt+2}")
-            time.sleep(retry_delay)
+            await asyncio.sleep(retry_delay)
     
     # This should not be reached due to the fallback, but just in case
     raise HTTPException(
@@ -1109,86 +3380,87 @@ def download_instagram_video(url: str) -> str:
         detail="Failed to download Instagram content after multiple attempts"
     )
 
-def find_media_files():
-    """Helper function to find media files in the upload directory with more robust patterns"""
-    # Look for all media files
-    media_files = []
-    
-    # Look for standard media files
-    for extension in ('.mp4', '.mov', '.avi', '.jpg', '.jpeg', '.png', '.gif', '.webp'):
-        files = glob.glob(os.path.join(UPLOAD_DIRECTORY, f"*{extension}"))
-        media_files.extend(files)
-    
-    # Look for date-formatted Instagram videos (YYYY-MM-DD_HH-MM-SS_UTC.mp4)
-    date_pattern_files = glob.glob(os.path.join(UPLOAD_DIRECTORY, "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]_*.mp4"))
-    media_files.extend(date_pattern_files)
+def instaloader_download(loader, shortcode, download_directory):
+    """Download a post with a pooled Instaloader (blocking), returning the media file's path"""
+    loader.dirname_pattern = download_directory
+    logger.info(f"Downloading Instagram post with shortcode: {shortcode}")
+    post = instaloader.Post.from_shortcode(loader.context, shortcode)
+    loader.download_post(post, target=download_directory)
+    logger.info("Instagram download successful")
+    return instaloader_media_path(post, download_directory)
+
+# yt-dlp's version, probed once: None until then, False when it isn't installed
+_yt_dlp_version = None
+# Created lazily so it binds to the running event loop (Python 3.9 binds on construction)
+_yt_dlp_semaphore = None
+
+async def probe_yt_dlp():
+    """Check once whether yt-dlp is installed, returning its version or False"""
+    global _yt_dlp_version
+    if _yt_dlp_version is None:
+        try:
+            stdout, _ = await run_media_tool([YTDLP_BINARY, "--version"], timeout=30)
+            _yt_dlp_version = stdout.decode(errors='replace').strip()
+            logger.info(f"yt-dlp {_yt_dlp_version} available for Instagram downloads")
+        except (OSError, RuntimeError) as e:
+            _yt_dlp_version = False
+            logger.warning(f"yt-dlp not installed, skipping this download method: {str(e)}")
+    return _yt_dlp_version
+
+@app.on_event("startup")
+async def probe_yt_dlp_on_startup():
+    if USE_YTDLP:
+        await probe_yt_dlp()
+
+def get_yt_dlp_semaphore():
+    """Get the worker-wide semaphore limiting concurrent yt-dlp downloads"""
+    global _yt_dlp_semaphore
+    if _yt_dlp_semaphore is None:
+        _yt_dlp_semaphore = asyncio.Semaphore(max(1, YTDLP_CONCURRENCY))
+    return _yt_dlp_semaphore
+
+async def attempt_yt_dlp_download(url: str, shortcode: str, download_directory: str):
+    """Attempt to download using yt-dlp if available, returning the downloaded file's path or None"""
+    if not await probe_yt_dlp():
+        return None
     
-    # Only return recent files (created in the last 5 minutes)
-    recent_media_files = [f for f in media_files if os.path.exists(f) and os.path.getmtime(f) > time.time() - 300]
+    output_template = os.path.join(download_directory, "media")
+    # Add more verbose output if debug mode is enabled
+    cmd = [YTDLP_BINARY] + (["-v"] if INSTAGRAM_DEBUG else ["--quiet", "--no-warnings"])
+    cmd.extend([
+        "-o", f"{output_template}.%(ext)s",
+        # Report the final file name instead of us searching for it
+        "--print", "after_move:filepath",
+        url
+    ])
     
-    logger.info(f"Found {len(recent_media_files)} recent media files in upload directory")
-    return recent_media_files
-
-def attempt_yt_dlp_download(url: str, shortcode: str) -> bool:
-    """Attempt to download using yt-dlp if available"""
     try:
-        import subprocess
-        
-        output_template = os.path.join(UPLOAD_DIRECTORY, f"instagram_{shortcode}")
-        
-        # Check if yt-dlp is installed
-        try:
-            subprocess.run(["yt-dlp", "--version"], check=True, capture_output=True)
-            ytdlp_installed = True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("yt-dlp not installed, skipping this download method")
-            return False
-            
-        if ytdlp_installed:
-            logger.info("Attempting download with yt-dlp")
-            
-            # Run yt-dlp to download the video
-            cmd = [
-                "yt-dlp",
-                "--no-warnings",
-            ]
-            
-            # Add more verbose output if debug mode is enabled
-            if INSTAGRAM_DEBUG:
-                cmd.remove("--no-warnings")
-                cmd.append("-v")
-            else:
-                cmd.append("--quiet")
-                
-            cmd.extend([
-                "-o", f"{output_template}.%(ext)s",
-                url
-            ])
-            
+        async with get_yt_dlp_semaphore():
             logger.info(f"Running yt-dlp command: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                logger.info("yt-dlp download successful")
-                if INSTAGRAM_DEBUG and result.stdout:
-                    logger.debug(f"yt-dlp output: {result.stdout}")
-                return True
-            else:
-                logger.warning(f"yt-dlp download failed with code {result.returncode}")
-                if result.stderr:
-                    logger.warning(f"yt-dlp error: {result.stderr}")
-                return False
-    except Exception as e:
-        logger.error(f"Error in yt-dlp download attempt: {str(e)}")
-        logger.error(traceback.format_exc())
-        return False
-        
-    return False
+            stdout, _ = await run_media_tool(cmd, timeout=YTDLP_TIMEOUT)
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"yt-dlp download failed: {str(e)}")
+        return None
+    
+    output = stdout.decode(errors='replace')
+    logger.info("yt-dlp download successful")
+    if INSTAGRAM_DEBUG and output:
+        logger.debug(f"yt-dlp output: {output}")
+    return yt_dlp_output_path(output)
+
+def yt_dlp_output_path(stdout):
+    """The file path yt-dlp printed for after_move:filepath, the last existing path in its output"""
+    for line in reversed(stdout.strip().splitlines()):
+        if os.path.isfile(line.strip()):
+            return line.strip()
+    logger.warning("yt-dlp did not report the downloaded file")
+    return None
 
-def attempt_alternative_download(url: str, shortcode: str) -> bool:
-    """Alternative download method using direct API/requests approach"""
+async def attempt_alternative_download(url: str, shortcode: str, download_directory: str):
+    """Alternative download method using direct API/page requests, returning the downloaded file's path or None"""
     try:
-        # Use requests to get the video URL directly
+        client = instagram_http_client.get()
+        # Fetch the pages directly and look for the video URL in them
         headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -1201,56 +3473,31 @@ def attempt_alternative_download(url: str, shortcode: str) -> bool:
         
         logger.info(f"Starting alternative download for Instagram URL: {url}")
         
-        # Try to use session cookies from instaloader if available
-        cookies = {}
-        try:
-            session_file = os.path.join(os.path.dirname(__file__), "instagram_session")
-            if os.path.exists(session_file):
-                logger.info("Attempting to extract cookies from Instagram session file")
-                with open(session_file, 'r') as f:
-                    session_content = f.read()
-                    # Extract sessionid from session file
-                    if 'sessionid' in session_content:
-                        sessionid_match = re.search(r'"sessionid":\s*"([^"]+)"', session_content)
-                        if sessionid_match:
-                            cookies['sessionid'] = sessionid_match.group(1)
-                            logger.info("Extracted sessionid from session file")
-                    
-                    # Extract csrf token from session file if available
-                    if 'csrftoken' in session_content:
-                        csrf_match = re.search(r'"csrftoken":\s*"([^"]+)"', session_content)
-                        if csrf_match:
-                            cookies['csrftoken'] = csrf_match.group(1)
-                            headers['X-CSRFToken'] = csrf_match.group(1)
-                            logger.info("Extracted csrftoken from session file")
-                    
-                    # Extract ds_user_id from session file if available
-                    if 'ds_user_id' in session_content:
-                        user_id_match = re.search(r'"ds_user_id":\s*"([^"]+)"', session_content)
-                        if user_id_match:
-                            cookies['ds_user_id'] = user_id_match.group(1)
-                            logger.info("Extracted ds_user_id from session file")
-        except Exception as e:
-            logger.error(f"Error extracting cookies from session file: {str(e)}")
-            # Continue without cookies
+        # Use the cookies of the shared Instagram session if there is one
+        cookies = instagram_sessions.cookies()
+        if 'csrftoken' in cookies:
+            headers['X-CSRFToken'] = cookies['csrftoken']
+        
+        # Session cookies go out with each request instead of living in the shared client
+        session_headers = dict(headers, Cookie="; ".join(f"{name}={value}" for name, value in cookies.items())) if cookies else headers
         
         # First try using embed URL which sometimes works without login
         embed_url = f"https://www.instagram.com/p/{shortcode}/embed/"
         logger.info(f"Attempting to fetch embed URL: {embed_url}")
         
-        response = requests.get(embed_url, headers=headers, cookies=cookies, timeout=10)
+        response = await client.get(embed_url, headers=session_headers, timeout=10)
         html_content = response.text
         
         if response.status_code != 200:
             # Fall back to original URL if embed fails
             logger.warning(f"Failed to get Instagram embed page: {response.status_code}")
             logger.info(f"Attempting to fetch main post URL: {url}")
-            response = requests.get(url, headers=headers, cookies=cookies, timeout=10)
+            response = await client.get(url, headers=session_headers, timeout=10)
             html_content = response.text
             
             if response.status_code != 200:
                 logger.warning(f"Failed to get Instagram page: {response.status_code}")
-                return False
+                return None
         
         # Save HTML for debugging if enabled
         if INSTAGRAM_DEBUG:
@@ -1266,7 +3513,7 @@ def attempt_alternative_download(url: str, shortcode: str) -> bool:
             # If no video URL found, try using API if we have cookies
             if cookies and 'sessionid' in cookies:
                 logger.info("Attempting to use Instagram API to get video URL")
-                api_video_url = get_video_url_from_api(shortcode, cookies, headers)
+                api_video_url = await get_video_url_from_api(shortcode, session_headers)
                 if api_video_url:
                     video_url = api_video_url
         
@@ -1274,49 +3521,48 @@ def attempt_alternative_download(url: str, shortcode: str) -> bool:
             # Final attempt - try the OEmbed API which sometimes works without auth
             oembed_url = f"https://api.instagram.com/oembed/?url=https://www.instagram.com/p/{shortcode}/"
             try:
-                oembed_response = requests.get(oembed_url, headers=headers, timeout=10)
+                oembed_response = await client.get(oembed_url, headers=headers, timeout=10)
                 if oembed_response.status_code == 200:
                     oembed_data = oembed_response.json()
                     # Extract URL from thumbnail URL by getting the post page
                     if 'thumbnail_url' in oembed_data:
                         logger.info(f"Found thumbnail URL in OEmbed response: {oembed_data['thumbnail_url']}")
                         # Use the thumbnail for now if we can't get the video
-                        img_response = requests.get(oembed_data['thumbnail_url'], headers=headers, stream=True, timeout=30)
-                        if img_response.status_code == 200:
-                            output_path = os.path.join(UPLOAD_DIRECTORY, f"instagram_{shortcode}.jpg")
-                            with open(output_path, 'wb') as f:
-                                for chunk in img_response.iter_content(chunk_size=8192):
-                                    f.write(chunk)
+                        output_path = os.path.join(download_directory, "media.jpg")
+                        if await stream_to_file(client, oembed_data['thumbnail_url'], headers, output_path):
                             logger.info(f"Downloaded thumbnail image as fallback to: {output_path}")
-                            return True
+                            return output_path
             except Exception as e:
                 logger.error(f"Error fetching OEmbed data: {str(e)}")
         
         if not video_url:
             logger.warning("Could not extract video URL from Instagram page")
-            return False
+            return None
             
         # Download the video
         logger.info(f"Attempting to download video from URL: {video_url}")
-        video_response = requests.get(video_url, headers=headers, stream=True, timeout=30)
-        
-        if video_response.status_code != 200:
-            logger.warning(f"Failed to download video: {video_response.status_code}")
-            return False
-            
-        # Save the video
-        output_path = os.path.join(UPLOAD_DIRECTORY, f"instagram_{shortcode}.mp4")
-        with open(output_path, 'wb') as f:
-            for chunk in video_response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        output_path = os.path.join(download_directory, "media.mp4")
+        if not await stream_to_file(client, video_url, headers, output_path):
+            return None
                 
         logger.info(f"Video downloaded successfully to {output_path}")
-        return True
+        return output_path
         
     except Exception as e:
         logger.error(f"Alternative download method failed: {str(e)}")
         logger.error(traceback.format_exc())
-        return False
+        return None
+
+async def stream_to_file(client, url, headers, output_path):
+    """Stream a response body to output_path in large chunks without holding it in memory, False on a non-200 status"""
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code != 200:
+            logger.warning(f"Failed to download media: {response.status_code}")
+            return False
+        with open(output_path, 'wb') as f:
+            async for chunk in response.aiter_bytes(INSTAGRAM_DOWNLOAD_CHUNK_BYTES):
+                await asyncio.to_thread(f.write, chunk)
+    return True
 
 def extract_video_url(html_content):
     """Extract video URL from HTML content using various patterns"""
@@ -1349,12 +3595,13 @@ def extract_video_url(html_content):
             
     return None
 
-def get_video_url_from_api(shortcode, cookies, headers):
-    """Attempt to get video URL directly from Instagram API"""
+async def get_video_url_from_api(shortcode, headers):
+    """Attempt to get video URL directly from Instagram API, headers carrying the session cookies"""
     try:
+        client = instagram_http_client.get()
         # First get the media ID from the shortcode
         media_id_url = f"https://www.instagram.com/p/{shortcode}/?__a=1&__d=dis"
-        response = requests.get(media_id_url, headers=headers, cookies=cookies, timeout=10)
+        response = await client.get(media_id_url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             logger.warning(f"Failed to get media ID: {response.status_code}")
@@ -1379,7 +3626,7 @@ def get_video_url_from_api(shortcode, cookies, headers):
             
         # Now get the media info which includes video URLs
         info_url = f"https://i.instagram.com/api/v1/media/{media_id}/info/"
-        info_response = requests.get(info_url, headers=headers, cookies=cookies, timeout=10)
+        info_response = await client.get(info_url, headers=headers, timeout=10)
         
         if info_response.status_code != 200:
             logger.warning(f"Failed to get media info: {info_response.status_code}")
@@ -1438,52 +3685,50 @@ def handle_instagram_fallback(url: str) -> str:
     )
 
 @app.post("/upload")
-async def upload_file(
-    file: UploadFile = File(None), 
-    url: str = Form(None), 
-    use_web_search: str = Form('true'),
-    preferred_language: str = Form('auto'),
-    background_tasks: BackgroundTasks = None,
-    x_openai_api_key: str = Header(None)
-):
+async def upload_file(request: Request, x_openai_api_key: str = Header(None)):
+    """
+    Fact-check an uploaded video or image, or an Instagram URL. Form fields: file or url, use_web_search,
+    preferred_language, priority and callback_url. Files need multipart/form-data and are stored as the body
+    arrives; a url can also be posted as application/x-www-form-urlencoded.
+    """
     try:
+        # Create upload directory if it doesn't exist
+        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+        
+        fields, media_path, content_hash = await receive_upload(request)
+        url = fields.get('url') or None
+        preferred_language = fields.get('preferred_language', 'auto')
+        priority = fields.get('priority', 'normal')
+        callback_url = fields.get('callback_url') or None
+        
         # Convert string 'true'/'false' to boolean
-        should_use_web_search = use_web_search.lower() == 'true'
+        should_use_web_search = fields.get('use_web_search', 'true').lower() == 'true'
         logger.info(f"Upload request - Use web search: {should_use_web_search}, Preferred language: {preferred_language}")
         
-        if not file and not url:
-            raise HTTPException(status_code=400, detail="Either file or URL is required")
-        
-        # Create upload directory if it doesn't exist
-        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+        try:
+            if not media_path and not url:
+                raise HTTPException(status_code=400, detail="Either file or URL is required")
+            if callback_url:
+                await validate_callback_url(callback_url)
+        except HTTPException:
+            if media_path:
+                os.remove(media_path)
+            raise
         
-        media_path = None
         is_instagram_url = False
         
         # Handle file upload
-        if file:
-            file_extension = os.path.splitext(file.filename)[1].lower()
-            # Normalize extensions by removing the dot if present in the environment variable
-            allowed_extensions_env = os.getenv('ALLOWED_FILE_TYPES', 'mp4,mov,avi,jpg,jpeg,png,gif')
-            allowed_extensions = [ext.strip().lower() for ext in allowed_extensions_env.split(',')]
-            allowed_extensions = [ext if ext.startswith('.') else f'.{ext}' for ext in allowed_extensions]
-            
-            # Check if the file extension is allowed
-            if file_extension not in allowed_extensions:
-                raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed types: {', '.join(ext.lstrip('.') for ext in allowed_extensions)}")
-            
-            media_path = os.path.join(UPLOAD_DIRECTORY, f"upload_{int(time.time())}{file_extension}")
-            
-            with open(media_path, "wb") as buffer:
-                buffer.write(await file.read())
-            
+        if media_path:
             logger.info(f"File uploaded: {media_path}")
         
         # Handle Instagram URL
         elif url:
             if "instagram.com" in url:
+                # Instagram links are almost always videos, don't download them while the queue is full
+                if video_queue.is_full():
+                    raise_queue_full()
                 try:
-                    media_path = download_instagram_video(url)
+                    media_path = await fetch_instagram_media(url)
                     if not media_path:
                         raise HTTPException(status_code=400, detail="Failed to download media from Instagram")
                     logger.info(f"Instagram media downloaded: {media_path}")
@@ -1496,22 +3741,53 @@ async def upload_file(
         
         # Process the media file based on its type
         if media_path.lower().endswith(('.mp4', '.mov', '.avi')):
+            # Reposted videos skip transcription and fact-checking entirely on a cache hit
+            content_hash = content_hash or await asyncio.to_thread(hash_file, media_path)
+            cache_key = make_cache_key(content_hash, 'video', should_use_web_search, preferred_language)
+            cached_result = await get_cached_result(cache_key)
+            if cached_result is not None:
+                os.remove(media_path)
+                return JSONResponse(content=cached_result)
+            
             logger.info(f"Processing video: {media_path}")
             # Generate a task ID for tracking
             task_id = str(uuid.uuid4())
-            # Pass custom_api_key to process_video
-            background_tasks.add_task(process_video, media_path, should_use_web_search, task_id, preferred_language, x_openai_api_key)
+            # Record the task right away so polls from any worker see it as queued
+            await save_task(task_id, {
+                "status": "queued",
+                "stage": "queued",
+                "timestamp": datetime.now().isoformat()
+            })
+            # Hand the job to the bounded video worker pool, with custom_api_key for process_video
+            job_args = (media_path, should_use_web_search, task_id, preferred_language, x_openai_api_key, cache_key)
+            if not video_queue.submit(task_id, job_args, priority, callback_url):
+                os.remove(media_path)
+                await save_task(task_id, {
+                    "status": "error",
+                    "stage": "error",
+                    "error": "Video queue is full",
+                    "timestamp": datetime.now().isoformat()
+                })
+                raise_queue_full()
             # Immediate response for background task with task_id
             return JSONResponse(content={
                 "message": "Video processing started. Results will be available shortly.", 
                 "status": "processing",
-                "task_id": task_id
+                "task_id": task_id,
+                "queue_position": video_queue.position(task_id)
             }, status_code=202)
         
         elif media_path.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
+            content_hash = content_hash or await asyncio.to_thread(hash_file, media_path)
+            cache_key = make_cache_key(content_hash, 'image', should_use_web_search, preferred_language)
+            cached_result = await get_cached_result(cache_key)
+            if cached_result is not None:
+                os.remove(media_path)
+                return JSONResponse(content=cached_result)
+            
             logger.info(f"Processing image: {media_path}")
             # Process as image with custom API key
-            image_analysis_results = analyze_image(media_path, should_use_web_search, preferred_language, x_openai_api_key)
+            image_analysis_results = await analyze_image(media_path, should_use_web_search, preferred_language, x_openai_api_key)
             
             # Extract the components from the analysis results
             analysis_result = image_analysis_results.get("analysis_result", "")
@@ -1522,7 +3798,7 @@ async def upload_file(
             if os.path.exists(media_path):
                 os.remove(media_path)
             
-            return JSONResponse(content={
+            result_data = {
                 "image_analysis": analysis_result,
                 "detected_language": detected_language,
                 "web_search_results": web_search_results,
@@ -1531,7 +3807,11 @@ async def upload_file(
                     "web_search": WEB_SEARCH_MODEL if should_use_web_search and web_search_results else "Not used", 
                     "web_search_enabled": should_use_web_search
                 }
-            })
+            }
+            await store_cached_result(cache_key, result_data)
+            result_data["cache"] = cache_status(cache_key)
+            
+            return JSONResponse(content=result_data)
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported media type: {media_path}")
 
@@ -1541,22 +3821,70 @@ async def upload_file(
         logger.error(f"Error processing upload: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+class APIKeyValidationCache:
+    """
+    Results of user API key validation, keyed by a SHA-256 of the key. Valid keys are cached for
+    API_KEY_VALID_TTL and rejected keys for API_KEY_INVALID_TTL; transient API errors aren't cached.
+    Concurrent validations of the same key share one API call.
+    """
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        # key hash -> (status, expires_at); least recently used first
+        self.results = OrderedDict()
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+    
+    async def status(self, key):
+        """'valid' or 'invalid' for the key"""
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        entry = self.results.get(key_hash)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self.results.move_to_end(key_hash)
+                self.hits += 1
+                return entry[0]
+            del self.results[key_hash]
+        
+        validation = self.in_flight.get(key_hash)
+        if validation is None:
+            self.misses += 1
+            validation = asyncio.ensure_future(self._validate(key, key_hash))
+            self.in_flight[key_hash] = validation
+            validation.add_done_callback(lambda _: self.in_flight.pop(key_hash, None))
+        # Shielded so one caller disconnecting doesn't cancel the validation the others wait on
+        return await asyncio.shield(validation)
+    
+    async def _validate(self, key, key_hash):
+        try:
+            # Make a minimal API call to test the key (the models endpoint takes no parameters)
+            await get_openai_client(key).models.list()
+            status, ttl = "valid", API_KEY_VALID_TTL
+        except (AuthenticationError, PermissionDeniedError) as e:
+            logger.warning(f"Invalid user API key {key_fingerprint(key)}: {str(e)}")
+            status, ttl = "invalid", API_KEY_INVALID_TTL
+        except Exception as e:
+            logger.warning(f"Could not validate user API key {key_fingerprint(key)}: {str(e)}")
+            return "invalid"
+        self.results[key_hash] = (status, time.monotonic() + ttl)
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+        return status
+    
+    def stats(self):
+        return {"entries": len(self.results), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+api_key_validations = APIKeyValidationCache(API_KEY_CACHE_MAX_ENTRIES)
+
 @app.get("/models")
 async def get_models(x_openai_api_key: str = Header(None)):
     """Get information about the AI models being used by the application"""
     try:
-        # Check if user-provided API key is valid
+        # Check if user-provided API key is valid, repeat visitors are answered from the cache
         user_key_status = "not_provided"
         if x_openai_api_key:
-            try:
-                # Create a test client with user key to validate it
-                test_client = OpenAI(api_key=x_openai_api_key)
-                # Make a minimal API call to test the key
-                _ = test_client.models.list(limit=1)
-                user_key_status = "valid"
-            except Exception as e:
-                logger.warning(f"Invalid user API key provided: {str(e)}")
-                user_key_status = "invalid"
+            user_key_status = await api_key_validations.status(x_openai_api_key)
         
         return JSONResponse(content={
             "models": {
@@ -1601,6 +3929,29 @@ async def get_models(x_openai_api_key: str = Header(None)):
         logger.error(f"Error retrieving model information: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error retrieving model information")
 
+def detect_text_language(text):
+    """Detect the language of free text input with langdetect, None if undetectable"""
+    try:
+        detected_language = langdetect.detect(text)
+        logger.info(f"Detected language for text input: {detected_language}")
+        return detected_language
+    except Exception as e:
+        logger.warning(f"Could not detect language: {str(e)}")
+        return None
+
+def text_result_data(fact_check_html, detected_language, web_search_results, should_use_web_search):
+    """Response body of a text fact-check"""
+    return {
+        "fact_check_html": fact_check_html,
+        "detected_language": detected_language,
+        "web_search_results": web_search_results,
+        "models": {
+            "fact_check": {"name": FACT_CHECK_MODEL},
+            "web_search": WEB_SEARCH_MODEL if should_use_web_search and web_search_results else "Not used",
+            "web_search_enabled": should_use_web_search
+        }
+    }
+
 @app.post("/fact-check-text")
 async def fact_check_text(
     text: str = Form(...), 
@@ -1613,16 +3964,15 @@ async def fact_check_text(
         should_use_web_search = use_web_search.lower() == 'true'
         logger.info(f"Fact-check text request - Use web search: {should_use_web_search}, Preferred language: {preferred_language}")
         
-        # Try to detect language using langdetect
-        detected_language = None
-        try:
-            detected_language = langdetect.detect(text)
-            logger.info(f"Detected language for text input: {detected_language}")
-        except Exception as e:
-            logger.warning(f"Could not detect language: {str(e)}")
+        # Identical texts are submitted repeatedly, answer those from the result cache
+        cache_key = make_cache_key(hash_text(text), 'text', should_use_web_search, preferred_language)
+        cached_result = await get_cached_result(cache_key)
+        if cached_result is not None:
+            return JSONResponse(content=cached_result)
+        
+        detected_language = detect_text_language(text)
             
-        # Perform fact-checking on the text with custom API key
-        fact_check_html = perform_fact_check(
+        fact_check_html, web_search_results = await fact_check_and_search(
             text, 
             detected_language, 
             should_use_web_search, 
@@ -1631,109 +3981,168 @@ async def fact_check_text(
             custom_api_key=x_openai_api_key
         )
         
-        # Perform web search if enabled for this request
-        web_search_results = None
-        if should_use_web_search:
-            try:
-                # Extract key factual claims from the text
-                claims_prompt = f"""
-                Based on this text, identify 5 specific factual claims that can be directly verified through web searches.
-                Focus on extracting clear, concrete statements that appear in the text.
-                
-                Format your response as a JSON object with a "claims" field containing an array of strings.
-                Example: {{"claims": ["The Eiffel Tower is 330 meters tall", "Barack Obama was the 44th President of the United States", etc.]}}
-                
-                Important: Formulate each claim as a direct statement (not a question) that can be fact-checked.
-                
-                Text:
-                {text[:2000]}  # Use first 2000 chars to keep context manageable
-                """
-                
-                # Get the appropriate OpenAI client
-                client = get_openai_client(x_openai_api_key)
-                
-                # If no client available, return an error
-                if client is None:
-                    return generate_error_fact_check("No OpenAI API key available. Please provide your API key in the interface.", should_use_web_search, 'text', x_openai_api_key)
-                
-                claims_response = client.chat.completions.create(
-                    model=FACT_CHECK_MODEL,
-                    messages=[
-                        {"role": "system", "content": "You are a skilled fact-checker who can identify specific, verifiable factual claims in text. Extract only clear, concrete claims that can be verified through web searches."},
-                        {"role": "user", "content": claims_prompt}
-                    ],
-                    response_format={"type": "json_object"},
-                    max_tokens=500
-                )
-                
-                claims_text = claims_response.choices[0].message.content.strip()
-                logger.info(f"Generated claims from text: {claims_text}")
-                
-                # Parse the JSON response
-                import json
-                try:
-                    claims_obj = json.loads(claims_text)
-                    factual_claims = claims_obj.get("claims", [])
-                    if not factual_claims:
-                        logger.warning("No claims extracted from the response")
-                        if isinstance(claims_obj, list):
-                            factual_claims = claims_obj
-                except json.JSONDecodeError as e:
-                    # Fallback in case of non-JSON response
-                    logger.warning(f"Failed to parse JSON response: {e}")
-                    # Try to extract claims using text processing
-                    import re
-                    claims_pattern = r'"([^"]+)"'
-                    factual_claims = re.findall(claims_pattern, claims_text)
-                    if not factual_claims:
-                        # Another fallback method
-                        claims_text = claims_text.replace("{", "").replace("}", "").replace("[", "").replace("]", "").replace("\"", "")
-                        lines = [line.strip() for line in claims_text.split("\n") if line.strip() and not line.strip().startswith('{') and not line.strip().startswith('}')]
-                        factual_claims = [line for line in lines if line]
-                
-                logger.info(f"Extracted {len(factual_claims)} claims for web search: {factual_claims}")
-                
-                # Perform web search for each claim
-                web_search_results = []
-                for claim in factual_claims[:5]:  # Limit to 5 claims
-                    search_result = perform_web_search(claim, x_openai_api_key)
-                    if search_result:
-                        web_search_results.append(search_result)
-                
-                logger.info(f"Completed {len(web_search_results)} web searches")
-            
-            except Exception as e:
-                logger.error(f"Error during web search extraction: {str(e)}")
-                web_search_results = [{"error": str(e), "search_query": "Error extracting search queries"}]
+        result_data = text_result_data(fact_check_html, detected_language, web_search_results, should_use_web_search)
+        await store_cached_result(cache_key, result_data)
+        result_data["cache"] = cache_status(cache_key)
         
-        return JSONResponse(content={
-            "fact_check_html": fact_check_html,
-            "detected_language": detected_language,
-            "web_search_results": web_search_results,
-            "models": {
-                "fact_check": {"name": FACT_CHECK_MODEL},
-                "web_search": WEB_SEARCH_MODEL if should_use_web_search and web_search_results else "Not used",
-                "web_search_enabled": should_use_web_search
-            }
-        })
+        return JSONResponse(content=result_data)
     except Exception as e:
         logger.error(f"Error fact-checking text: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error fact-checking text: {str(e)}")
 
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/fact-check-text/stream")
+async def fact_check_text_stream(
+    text: str = Form(...), 
+    use_web_search: str = Form('true'), 
+    preferred_language: str = Form('auto'),
+    x_openai_api_key: str = Header(None)
+):
+    """
+    /fact-check-text as Server-Sent Events. Partial results are pushed as they are generated:
+    verdict, conclusion and finding events (fact_check_delta chunks with FACT_CHECK_OUTPUT=html),
+    the extracted claims and each search_result. The final result event carries the /fact-check-text body,
+    an error event is sent instead if the request fails.
+    """
+    should_use_web_search = use_web_search.lower() == 'true'
+    logger.info(f"Streaming fact-check text request - Use web search: {should_use_web_search}, Preferred language: {preferred_language}")
+    cache_key = make_cache_key(hash_text(text), 'text', should_use_web_search, preferred_language)
+    messages = asyncio.Queue()
+
+    async def emit(event, data):
+        await messages.put(format_sse(event, data))
+
+    async def emit_claims(claims):
+        await emit("claims", {"claims": claims})
+
+    async def emit_search_result(index, result):
+        await emit("search_result", {"index": index, "result": result})
+
+    async def run():
+        try:
+            cached_result = await get_cached_result(cache_key)
+            if cached_result is not None:
+                await emit("result", cached_result)
+                return
+
+            detected_language = detect_text_language(text)
+            fact_check_coro = stream_fact_check(text, detected_language, should_use_web_search, 'text', preferred_language, x_openai_api_key, emit)
+            if should_use_web_search:
+                # Claims are extracted by a separate call here so their searches start right away
+                fact_check_html, web_search_results = await asyncio.gather(
+                    fact_check_coro,
+                    search_claims(text, x_openai_api_key, 'text', on_claims=emit_claims, on_result=emit_search_result)
+                )
+            else:
+                fact_check_html = await fact_check_coro
+                web_search_results = None
+
+            result_data = text_result_data(fact_check_html, detected_language, web_search_results, should_use_web_search)
+            await store_cached_result(cache_key, result_data)
+            result_data["cache"] = cache_status(cache_key)
+            await emit("result", result_data)
+        except Exception as e:
+            logger.error(f"Error streaming text fact-check: {str(e)}", exc_info=True)
+            await emit("error", {"detail": f"Error fact-checking text: {str(e)}"})
+        finally:
+            await messages.put(None)
+
+    async def event_stream():
+        producer = asyncio.create_task(run())
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                yield message
+        finally:
+            # Stops the model calls when the client disconnects
+            producer.cancel()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let a reverse proxy buffer the events
+    })
+
+def require_admin(x_admin_key):
+    """Reject requests that don't carry the configured admin key"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled. Set ADMIN_API_KEY to enable them.")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+@app.delete("/admin/cache")
+async def invalidate_result_cache(key: str = Query(None), x_admin_key: str = Header(None)):
+    """Invalidate one cached result by its key (as reported in responses), or the whole cache"""
+    require_admin(x_admin_key)
+    if result_cache is None:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    try:
+        removed = await asyncio.to_thread(result_cache.invalidate, key)
+        logger.info(f"Invalidated {removed} cached results" + (f" for key {key}" if key else ""))
+        return JSONResponse(content={"invalidated": removed, "key": key})
+    except Exception as e:
+        logger.error(f"Error invalidating result cache: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error invalidating result cache: {str(e)}")
+
+@app.get("/admin/cache/stats")
+async def get_cache_stats(x_admin_key: str = Header(None)):
+    """
+    Report cache sizes and hit rates for capacity planning. The web search cache is shared, so its numbers cover
+    every worker and video job process; the other hit counts and the OpenAI client pool are for this process only.
+    """
+    require_admin(x_admin_key)
+    return JSONResponse(content={
+        "web_search_cache": await asyncio.to_thread(web_search_cache.stats),
+        "instagram_media_cache": await asyncio.to_thread(instagram_media_cache.stats) if instagram_media_cache is not None else None,
+        "openai_clients": openai_client_pool.stats(),
+        "api_key_validations": api_key_validations.stats()
+    })
+
+@app.get("/admin/queue/stats")
+async def get_queue_stats(x_admin_key: str = Header(None)):
+    """Report video job queue depth and throughput"""
+    require_admin(x_admin_key)
+    return JSONResponse(content={"video_queue": video_queue.stats()})
+
+def task_snapshot(task_id, task_data):
+    """Task status as returned to clients: queued jobs report their place in line when this worker owns the queue entry"""
+    if task_data.get('status') == 'queued':
+        queue_position = video_queue.position(task_id)
+        if queue_position is not None:
+            task_data['queue_position'] = queue_position
+    return task_data
+
+def task_etag(task_data):
+    return '"' + hashlib.sha256(json.dumps(task_data, sort_keys=True).encode("utf-8")).hexdigest()[:32] + '"'
+
 @app.get("/task/{task_id}")
-async def get_task_status(task_id: str, x_openai_api_key: str = Header(None)):
-    """Get the status of a background task by its ID"""
+async def get_task_status(task_id: str, x_openai_api_key: str = Header(None), if_none_match: str = Header(None)):
+    """
+    Get the status of a background task by its ID.
+    Responses carry an ETag, so a poll with a matching If-None-Match gets an empty 304 while nothing changed.
+    """
     try:
-        # Check if task exists in our tracking dictionary
-        if task_id not in task_results:
+        # Check if task exists in the task store
+        task_data = await asyncio.to_thread(task_store.get, task_id)
+        if task_data is None:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
         
+        task_data = task_snapshot(task_id, task_data)
+        etag = task_etag(task_data)
+        # Clients must revalidate every time, the status changes while the task runs
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=cache_headers)
+        
         # If the task is still in progress and has an error status, try to generate a better error message
-        task_data = task_results[task_id]
         if task_data.get('status') == 'error' and 'error_details' in task_data:
             # Generate a more detailed error message using the AI
             try:
-                error_html = generate_error_fact_check(
+                error_html = await generate_error_fact_check(
                     task_data['error_details'], 
                     task_data.get('web_search_enabled', True),
                     task_data.get('context', 'unknown'),
@@ -1744,35 +4153,68 @@ async def get_task_status(task_id: str, x_openai_api_key: str = Header(None)):
                 logger.error(f"Error generating detailed error message: {str(e)}")
         
         # Return the task result
-        return JSONResponse(content=task_results[task_id])
+        return JSONResponse(content=task_data, headers=cache_headers)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error retrieving task status: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error retrieving task status: {str(e)}")
 
+TASK_FINAL_EVENTS = {'completed': 'completed', 'error': 'failed'}
+
+@app.get("/task/{task_id}/events")
+async def task_events_stream(task_id: str):
+    """
+    Server-Sent Events for a background task, instead of polling /task/{task_id}.
+    Sends a stage event on every transition (queued, starting, extracting_audio, transcribing, fact_checking,
+    searching) and ends with a completed or failed event carrying the full task status.
+    """
+    task_data = await asyncio.to_thread(task_store.get, task_id)
+    if task_data is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+
+    async def event_stream():
+        current = task_data
+        last_etag = None
+        last_sent = time.time()
+        while True:
+            if current is None:
+                yield format_sse("failed", {"task_id": task_id, "status": "error", "error": "Task expired"})
+                return
+            snapshot = task_snapshot(task_id, current)
+            etag = task_etag(snapshot)
+            status = snapshot.get('status')
+            if status in TASK_FINAL_EVENTS:
+                yield format_sse(TASK_FINAL_EVENTS[status], {"task_id": task_id, **snapshot})
+                return
+            if etag != last_etag:
+                yield format_sse("stage", {
+                    "task_id": task_id,
+                    "status": status,
+                    "stage": snapshot.get('stage', status),
+                    "queue_position": snapshot.get('queue_position'),
+                    "timestamp": snapshot.get('timestamp')
+                })
+                last_etag = etag
+                last_sent = time.time()
+            elif time.time() - last_sent >= TASK_EVENTS_KEEPALIVE:
+                # Comment line that keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            # Updates from this process wake the stream at once, worker process updates show up on the next read
+            await task_events.wait(task_id, TASK_EVENTS_POLL_INTERVAL)
+            current = await asyncio.to_thread(task_store.get, task_id)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 # Clean up old tasks to prevent memory leaks
 def cleanup_old_tasks():
-    """Remove task results older than 24 hours to prevent memory leaks"""
-    current_time = datetime.now()
-    to_remove = []
-    
-    # Find old tasks
-    for task_id, result in task_results.items():
-        if 'timestamp' in result:
-            try:
-                timestamp = datetime.fromisoformat(result['timestamp'])
-                if current_time - timestamp > timedelta(hours=24):
-                    to_remove.append(task_id)
-            except (ValueError, TypeError):
-                # If timestamp is invalid, add to removal list
-                to_remove.append(task_id)
-    
-    # Remove old tasks
-    for task_id in to_remove:
-        task_results.pop(task_id, None)
-        
-    logger.debug(f"Cleaned up {len(to_remove)} old tasks")
+    """Remove expired task results; both stores only visit the expired entries"""
+    removed = task_store.cleanup_expired()
+    logger.debug(f"Cleaned up {removed} old tasks")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,66 @@
+"""
+Compare audio extraction for transcription: the previous moviepy path (full decode to WAV)
+against the ffmpeg extract_audio stage in app.py. Reports wall time and output bytes per video.
+
+Usage: python benchmark_audio_extraction.py video.mp4 [more videos...]
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app import extract_audio
+
+
+def extract_with_moviepy(video_path, workspace):
+    """The old process_video extraction: decode the whole clip and write uncompressed WAV"""
+    from moviepy.editor import VideoFileClip
+
+    audio_path = os.path.join(workspace, "extracted_audio.wav")
+    video = VideoFileClip(video_path)
+    try:
+        video.audio.write_audiofile(audio_path, verbose=False, logger=None)
+    finally:
+        video.close()
+    return audio_path
+
+
+def extract_with_ffmpeg(video_path, workspace):
+    return asyncio.run(extract_audio(video_path, workspace))
+
+
+def measure(extract, video_path):
+    workspace = tempfile.mkdtemp(prefix="bench_")
+    try:
+        started = time.perf_counter()
+        audio_path = extract(video_path, workspace)
+        elapsed = time.perf_counter() - started
+        return elapsed, os.path.getsize(audio_path)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def main(video_paths):
+    if not video_paths:
+        print(__doc__)
+        return 1
+
+    print(f"{'video':<40} {'method':<8} {'seconds':>9} {'bytes':>12}")
+    for video_path in video_paths:
+        name = os.path.basename(video_path)[:40]
+        results = {
+            "moviepy": measure(extract_with_moviepy, video_path),
+            "ffmpeg": measure(extract_with_ffmpeg, video_path),
+        }
+        for method, (elapsed, size) in results.items():
+            print(f"{name:<40} {method:<8} {elapsed:>9.2f} {size:>12,}")
+        moviepy_time, moviepy_bytes = results["moviepy"]
+        ffmpeg_time, ffmpeg_bytes = results["ffmpeg"]
+        print(f"{'':<40} {'speedup':<8} {moviepy_time / ffmpeg_time:>8.1f}x {moviepy_bytes / ffmpeg_bytes:>11.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
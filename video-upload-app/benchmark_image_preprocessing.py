@@ -0,0 +1,60 @@
+"""
+Compare the image payload sent to the vision model before and after preprocessing:
+the raw file base64-encoded as before, against prepare_image in app.py.
+Reports bytes sent per call and, with --call-api, the latency of one vision request for each payload.
+
+Usage: python benchmark_image_preprocessing.py [--call-api] image.jpg [more images...]
+"""
+import asyncio
+import base64
+import os
+import sys
+import time
+
+from app import IMAGE_ANALYSIS_MODEL, get_openai_client, prepare_image
+
+
+def raw_data_url(image_path):
+    """The old analyze_image payload: file bytes as-is, always labelled image/jpeg"""
+    with open(image_path, "rb") as image_file:
+        return f"data:image/jpeg;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
+
+
+async def vision_latency(image_data_url):
+    client = get_openai_client()
+    if client is None:
+        raise SystemExit("--call-api needs OPENAI_API_KEY")
+    started = time.perf_counter()
+    await client.chat.completions.create(
+        model=IMAGE_ANALYSIS_MODEL,
+        messages=[{"role": "user", "content": [
+            {"type": "text", "text": "Describe this image in one sentence."},
+            {"type": "image_url", "image_url": {"url": image_data_url}}
+        ]}],
+        max_tokens=50
+    )
+    return time.perf_counter() - started
+
+
+def main(args):
+    call_api = "--call-api" in args
+    image_paths = [arg for arg in args if arg != "--call-api"]
+    if not image_paths:
+        print(__doc__)
+        return 1
+
+    print(f"{'image':<40} {'method':<9} {'prep s':>8} {'bytes sent':>12} {'api s':>8}")
+    for image_path in image_paths:
+        name = os.path.basename(image_path)[:40]
+        for method, build in (("raw", raw_data_url), ("prepared", prepare_image)):
+            started = time.perf_counter()
+            image_data_url = build(image_path)
+            prep_time = time.perf_counter() - started
+            api_time = f"{asyncio.run(vision_latency(image_data_url)):>8.2f}" if call_api else f"{'-':>8}"
+            # Both the analysis and the claim extraction request carry this payload
+            print(f"{name:<40} {method:<9} {prep_time:>8.3f} {len(image_data_url):>12,} {api_time}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))